@@ -0,0 +1,15 @@
+# US EPA AQI categories: (upper bound, name, short label, colour)
+AQI_BANDS = [
+    (50, "Good", "Good", "#10B981"),
+    (100, "Moderate", "Moderate", "#F59E0B"),
+    (150, "Unhealthy for Sensitive Groups", "USG", "#F97316"),
+    (200, "Unhealthy", "Unhealthy", "#EF4444"),
+    (300, "Very Unhealthy", "Very Unhealthy", "#8B5CF6"),
+    (float("inf"), "Hazardous", "Hazardous", "#7F1D1D")
+]
+
+def get_aqi_status(aqi):
+    for upper, name, _, color in AQI_BANDS:
+        if aqi <= upper:
+            return name, color
+    return AQI_BANDS[-1][1], AQI_BANDS[-1][3]
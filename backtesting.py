@@ -0,0 +1,121 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from feature_engine import FEATURES, TARGETS, HORIZON_HOURS
+from aqi_status import AQI_BANDS
+
+# Rolling-origin backtest: every row from `min_train_rows` on is a forecast
+# origin. The model is refit on an expanding window only once per block of
+# `refit_every` origins, and all origins in a block are predicted with one
+# batched predict call. Blocks are independent and run in parallel.
+
+REFIT_EVERY = 24 * 7
+MIN_TRAIN_ROWS = 24 * 30
+
+def origin_blocks(n_rows, min_train_rows=MIN_TRAIN_ROWS, refit_every=REFIT_EVERY):
+    return [
+        (start, min(start + refit_every, n_rows))
+        for start in range(min_train_rows, n_rows, refit_every)
+    ]
+
+def _run_block(estimator, X, y, times, start, end):
+    # Only rows whose furthest target is known before the first origin of
+    # the block are used for training
+    cutoff = times[start] - np.timedelta64(max(HORIZON_HOURS), "h")
+    train = times[:start] <= cutoff
+    if train.sum() == 0:
+        return None
+    model = clone(estimator)
+    model.fit(X[:start][train], y[:start][train])
+    return start, model.predict(X[start:end])
+
+def band_labels(values):
+    uppers = np.array([upper for upper, *_ in AQI_BANDS])
+    names = np.array([name for _, name, *_ in AQI_BANDS])
+    return names[np.minimum(np.searchsorted(uppers, values, side="left"), len(names) - 1)]
+
+def score_predictions(actual, predicted):
+    """
+    MAE / RMSE per horizon, overall and per AQI category band of the
+    actual value
+    """
+    rows = []
+    for i, target in enumerate(TARGETS):
+        error = predicted[:, i] - actual[:, i]
+        bands = band_labels(actual[:, i])
+        groups = [("All", np.ones(len(error), dtype=bool))]
+        groups += [(name, bands == name) for _, name, *_ in AQI_BANDS]
+        for band, mask in groups:
+            if not mask.any():
+                continue
+            rows.append({
+                "horizon": target,
+                "band": band,
+                "n": int(mask.sum()),
+                "mae": float(np.abs(error[mask]).mean()),
+                "rmse": float(np.sqrt((error[mask] ** 2).mean()))
+            })
+    return pd.DataFrame(rows)
+
+def backtest(estimator, df, refit_every=REFIT_EVERY, min_train_rows=MIN_TRAIN_ROWS, n_jobs=-1):
+    """
+    `df` is a training frame from feature_engine.build_training_frame.
+    Returns (per-origin predictions, metrics per horizon and band).
+    """
+    X = df[FEATURES].to_numpy(dtype=np.float64)
+    y = df[TARGETS].to_numpy(dtype=np.float64)
+    times = df["time"].to_numpy(dtype="datetime64[ns]")
+
+    blocks = origin_blocks(len(df), min_train_rows, refit_every)
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_run_block)(estimator, X, y, times, start, end) for start, end in blocks
+    )
+    results = [r for r in results if r is not None]
+    if not results:
+        raise ValueError("Not enough history for a single backtest block")
+
+    first = results[0][0]
+    predicted = np.concatenate([p for _, p in results])
+    actual = y[first:first + len(predicted)]
+
+    predictions = pd.DataFrame(predicted, columns=[f"{t}_pred" for t in TARGETS])
+    predictions.insert(0, "time", times[first:first + len(predicted)])
+    for i, target in enumerate(TARGETS):
+        predictions[target] = actual[:, i]
+
+    return predictions, score_predictions(actual, predicted)
+
+
+def main():
+
+    import model_training
+    import feature_store
+
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the AQI models")
+    parser.add_argument("--family", choices=list(model_training.MODEL_FAMILIES), default="XGBoost")
+    parser.add_argument("--refit-every", type=int, default=REFIT_EVERY, help="Origins (hours) between refits")
+    parser.add_argument("--min-train-rows", type=int, default=MIN_TRAIN_ROWS)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--output", help="Write the metrics table to this CSV file")
+    args = parser.parse_args()
+
+    store_dir = os.getenv("AQI_FEATURE_STORE_DIR")
+    if store_dir:
+        df = feature_store.read_store(store_dir)
+    else:
+        df = model_training.data_extraction(os.getenv("MONGO_URI"))
+    df = model_training.data_preprocessing(df)
+
+    builder, _ = model_training.MODEL_FAMILIES[args.family]
+    _, metrics = backtest(builder(), df, args.refit_every, args.min_train_rows, args.n_jobs)
+
+    print(metrics.to_string(index=False))
+    if args.output:
+        metrics.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from unittest import mock
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+import data_access
+import etl
+import model_training
+import tree_runtime
+from feature_engine import FEATURES, latest_feature_row
+
+# End-to-end benchmark on synthetic data. Hourly pollutant series with
+# annual, weekly and diurnal cycles, persistent noise, decaying pollution
+# spikes, outage gaps, missing fields and duplicate re-polled readings are
+# loaded into mongomock (or a local mongod via --mongo-uri). Every pipeline
+# stage is then timed and the results are written as JSON; --baseline
+# compares against an earlier run and exits non-zero on regressions.
+#
+#   python benchmark.py --months 1
+#   python benchmark.py --years 10 --cities 50 --skip-training --mongo-uri mongodb://localhost
+#   python benchmark.py --baseline benchmark_results.json --output new.json
+
+CITY_NAMES = [
+    "Karachi", "Lahore", "Islamabad", "Rawalpindi", "Faisalabad",
+    "Multan", "Peshawar", "Quetta", "Hyderabad", "Sialkot"
+]
+
+# Typical Karachi concentrations; each city scales them by its own factor
+POLLUTANT_SCALES = {"co": 400.0, "no2": 20.0, "o3": 60.0, "pm10": 80.0, "pm2_5": 45.0, "so2": 10.0}
+
+# US EPA PM2.5 breakpoints (µg/m³ -> AQI), interpolated linearly
+PM25_BREAKPOINTS = [0.0, 12.0, 35.4, 55.4, 150.4, 250.4, 500.4]
+AQI_BREAKPOINTS = [0.0, 50.0, 100.0, 150.0, 200.0, 300.0, 500.0]
+
+GAP_RATE = 0.01
+SPIKE_RATE = 0.005
+MISSING_RATE = 0.005
+DUPLICATE_RATE = 0.01
+
+# The dashboard reads this much history (see aqi_forecast_app.HISTORY_ROWS)
+DASHBOARD_HISTORY_ROWS = 720
+ETL_TRANSFORM_CALLS = 1000
+
+def city_name(i):
+    return CITY_NAMES[i] if i < len(CITY_NAMES) else f"City{i}"
+
+def pm25_to_aqi(pm2_5):
+    return np.interp(pm2_5, PM25_BREAKPOINTS, AQI_BREAKPOINTS)
+
+def generate_readings(start, hours, seed=0, city_factor=1.0, gap_rate=GAP_RATE,
+                      spike_rate=SPIKE_RATE, missing_rate=MISSING_RATE,
+                      duplicate_rate=DUPLICATE_RATE):
+    """
+    One city's hourly readings as stored by the ETL, warts included: gaps,
+    missing fields (NaN) and duplicate readings a few minutes into an
+    already-stored hour. Sorted by time.
+    """
+    rng = np.random.default_rng(seed)
+    time = pd.date_range(pd.Timestamp(start).floor("h"), periods=hours, freq="h")
+    day_of_year = time.dayofyear.to_numpy()
+    hour = time.hour.to_numpy()
+
+    # Winter peak, morning and evening rush hours, quieter weekends
+    seasonal = 1 + 0.5 * np.cos(2 * np.pi * (day_of_year - 15) / 365.25)
+    diurnal = 1 + 0.2 * np.cos(2 * np.pi * (hour - 8) / 12)
+    weekly = np.where(time.dayofweek.to_numpy() >= 5, 0.9, 1.0)
+
+    # Persistent AR(1) weather noise and exponentially decaying spikes
+    noise = lfilter([1.0], [1.0, -0.95], rng.normal(0, 0.08, hours))
+    events = (rng.random(hours) < spike_rate) * rng.exponential(2.0, hours)
+    spikes = lfilter([1.0], [1.0, -0.85], events)
+
+    base = seasonal * diurnal * weekly * np.exp(noise) * (1 + spikes) * city_factor
+    df = pd.DataFrame({"time": time})
+    for name, scale in POLLUTANT_SCALES.items():
+        df[name] = scale * base * np.exp(rng.normal(0, 0.1, hours))
+    df["aqi"] = np.round(pm25_to_aqi(df["pm2_5"].to_numpy()))
+
+    # Outages: contiguous runs of missing hours, ~12 hours long on average
+    keep = np.ones(hours, dtype=bool)
+    for gap_start in np.flatnonzero(rng.random(hours) < gap_rate / 12):
+        keep[gap_start:gap_start + rng.geometric(1 / 12)] = False
+    df = df[keep].reset_index(drop=True)
+
+    for name in [*POLLUTANT_SCALES, "aqi"]:
+        df.loc[rng.random(len(df)) < missing_rate, name] = np.nan
+
+    duplicates = df[rng.random(len(df)) < duplicate_rate].copy()
+    duplicates["time"] += pd.to_timedelta(rng.integers(1, 60, len(duplicates)), unit="min")
+    duplicates[list(POLLUTANT_SCALES)] *= rng.normal(1, 0.02, (len(duplicates), len(POLLUTANT_SCALES)))
+
+    return pd.concat([df, duplicates]).sort_values("time", kind="stable").reset_index(drop=True)
+
+def to_documents(df, **extra):
+    docs = df.astype(object).where(df.notna(), None).to_dict("records")
+    for doc in docs:
+        doc["time"] = doc["time"].to_pydatetime()
+        doc.update(extra)
+    return docs
+
+def load_synthetic_data(db, hours, cities, start, seed, batch_size=50000):
+    """
+    The first city goes to karachi_aqi_etl; every city also goes to the
+    multi-city collection, as the ETL does. Returns rows per collection.
+    """
+    rows = {"karachi_aqi_etl": 0, data_access.CITY_COLLECTION: 0}
+    for i in range(cities):
+        df = generate_readings(start, hours, seed=seed + i, city_factor=0.6 + 0.8 * (i % 5) / 4)
+        targets = [(data_access.CITY_COLLECTION, {"city": city_name(i)})]
+        if i == 0:
+            targets.insert(0, ("karachi_aqi_etl", {}))
+        for collection, extra in targets:
+            docs = to_documents(df, **extra)
+            for chunk in range(0, len(docs), batch_size):
+                db[collection].insert_many(docs[chunk:chunk + batch_size])
+            rows[collection] += len(docs)
+    return rows
+
+def time_stage(results, name, fn, repeat=1, rows=None, calls=1):
+    """
+    Run `fn` `repeat` times; `calls` > 1 reports seconds per call
+    """
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = fn()
+        seconds.append((time.perf_counter() - started) / calls)
+    results[name] = {
+        "median_seconds": float(np.median(seconds)),
+        "min_seconds": float(min(seconds)),
+        "seconds": seconds,
+        "rows": rows
+    }
+    print(f"{name:<32} {np.median(seconds):10.4f}s" + (f"  ({rows} rows)" if rows else ""))
+    return value
+
+def dashboard_load_and_predict(collection, model, runtime=None):
+    """
+    The dashboard's cold path: newest history, latest feature row, predict
+    (through the tree runtime when the model has one, as the app does)
+    """
+    # Same data-access call and projection as the app's fetch_new_readings
+    rows = data_access.latest_readings(collection, DASHBOARD_HISTORY_ROWS, data_access.READING_PROJECTION)
+    df = pd.DataFrame(rows)
+    df["time"] = pd.to_datetime(df["time"])
+    latest_input = latest_feature_row(df.sort_values("time"))[FEATURES].values
+    if runtime is not None:
+        return tree_runtime.predict(runtime, latest_input)
+    return model.predict(latest_input)
+
+def api_payload(rng):
+    payload = {
+        field.rsplit(".", 1)[0]: {"concentration": float(rng.uniform(1, 100))}
+        for field in etl.FIELD_MAP if field.endswith(".concentration")
+    }
+    payload["overall_aqi"] = int(rng.integers(20, 300))
+    return payload
+
+def environment():
+    import sklearn
+    import xgboost
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "xgboost": xgboost.__version__
+    }
+
+def run(args):
+    if args.mongo_uri:
+        client = data_access.get_client(args.mongo_uri)
+    else:
+        # From requirements-dev.txt
+        import mongomock
+
+        client = mongomock.MongoClient()
+
+    # Never write into a real aqi_data database
+    db = client["aqi_benchmark"]
+    for collection in ["karachi_aqi_etl", data_access.CITY_COLLECTION]:
+        db[collection].drop()
+
+    months = args.months if args.months is not None else (0 if args.years else 1)
+    hours = int(args.years * 365 * 24 + months * 30 * 24)
+    results = {}
+
+    loaded = time_stage(
+        results, "generate_and_load",
+        lambda: load_synthetic_data(db, hours, args.cities, args.start, args.seed)
+    )
+
+    # data_extraction asks the shared data-access layer for aqi_data; hand it
+    # the benchmark database instead
+    with mock.patch.object(data_access, "get_database", lambda uri=None: db):
+        raw = time_stage(
+            results, "data_extraction", lambda: model_training.data_extraction(args.mongo_uri),
+            args.repeat, rows=loaded["karachi_aqi_etl"]
+        )
+
+    df = time_stage(results, "data_preprocessing", lambda: model_training.data_preprocessing(raw), args.repeat, rows=len(raw))
+    X_train, X_test, y_train, y_test = model_training.data_splitting(df)
+
+    trainers = {
+        "XGBoost": model_training.train_xgboost,
+        "RandomForest": model_training.train_random_forest,
+        "SVR": model_training.train_svr
+    }
+    models = {}
+    if not args.skip_training:
+        for family in args.families:
+            trainer = trainers[family]
+            models[family], _ = time_stage(
+                results, trainer.__name__, lambda: trainer(X_train, y_train), rows=len(X_train)
+            )
+            time_stage(
+                results, f"evaluate_model[{family}]",
+                lambda: model_training.evaluate_model(models[family], X_test, y_test),
+                args.repeat, rows=len(X_test)
+            )
+
+    if models:
+        family = next(iter(models))
+        try:
+            runtime = tree_runtime.export_model(models[family])
+        except TypeError:
+            runtime = None
+        time_stage(
+            results, f"dashboard_load_predict[{family}]",
+            lambda: dashboard_load_and_predict(db["karachi_aqi_etl"], models[family], runtime),
+            args.repeat
+        )
+
+    rng = np.random.default_rng(args.seed)
+    payload = api_payload(rng)
+    time_stage(
+        results, "etl_transform_data",
+        lambda: [etl.transform_data(payload) for _ in range(ETL_TRANSFORM_CALLS)],
+        args.repeat, calls=ETL_TRANSFORM_CALLS
+    )
+    city_results = [(city_name(i), api_payload(rng)) for i in range(args.cities)]
+    time_stage(
+        results, "etl_transform_cities",
+        lambda: etl.transform_cities(city_results),
+        args.repeat, rows=args.cities
+    )
+
+    return {
+        "config": {
+            "years": args.years,
+            "months": months,
+            "cities": args.cities,
+            "hours_per_city": hours,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "backend": "mongod" if args.mongo_uri else "mongomock"
+        },
+        "environment": environment(),
+        "created_at": pd.Timestamp.now(tz="UTC").isoformat(),
+        "stages": results
+    }
+
+def compare(results, baseline, tolerance):
+    """
+    Stages whose median got slower than the baseline by more than
+    `tolerance` (a fraction)
+    """
+    regressions = []
+    for name, stage in results["stages"].items():
+        previous = baseline["stages"].get(name)
+        if previous is None:
+            continue
+        ratio = stage["median_seconds"] / max(previous["median_seconds"], 1e-9)
+        if ratio > 1 + tolerance:
+            regressions.append({"stage": name, "baseline": previous["median_seconds"],
+                                "current": stage["median_seconds"], "ratio": ratio})
+    return regressions
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark the AQI pipeline on synthetic data")
+    parser.add_argument("--years", type=float, default=0)
+    parser.add_argument("--months", type=float, help="Added to --years; defaults to 1 when --years is not set")
+    parser.add_argument("--cities", type=int, default=1)
+    parser.add_argument("--start", default="2016-01-01")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per cheap stage; training runs once")
+    parser.add_argument("--families", default="XGBoost,RandomForest,SVR",
+                        type=lambda value: [f.strip() for f in value.split(",") if f.strip()])
+    parser.add_argument("--skip-training", action="store_true", help="SVR grid search scales quadratically with rows")
+    parser.add_argument("--mongo-uri", help="Local mongod to use instead of mongomock (writes to aqi_benchmark)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs the baseline")
+    args = parser.parse_args()
+
+    results = run(args)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["regressions"] = compare(results, json.load(f), args.tolerance)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if results.get("regressions"):
+        for regression in results["regressions"]:
+            print(f"REGRESSION {regression['stage']}: {regression['baseline']:.4f}s -> "
+                  f"{regression['current']:.4f}s ({regression['ratio']:.2f}x)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
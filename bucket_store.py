@@ -0,0 +1,303 @@
+import argparse
+import os
+from datetime import datetime, timedelta
+from bson.binary import Binary
+import numpy as np
+import pandas as pd
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
+from data_access import INGESTED_FIELD, READING_FIELDS, normalize_hour, aggregate_readings, get_database, with_retry
+
+# Bucketed layout for aqi_data.karachi_aqi_etl: one document per UTC day in
+# karachi_aqi_buckets. `hours` (uint8) and every field (little-endian
+# float64, NaN when missing) are packed binary arrays, so a reader gets a
+# day of readings from one BSON value per column via np.frombuffer. The
+# per-field summaries stay queryable:
+#
+#   {"_id": <day>, "count": 24, "hours": <bytes>, "aqi": <bytes>, ...,
+#    "summary": {"aqi": {"min": .., "max": .., "mean": .., "count": ..}, ...}}
+#
+# The ETL keeps writing flat hourly documents. compact() folds every closed
+# day into its bucket and deletes flat documents older than
+# FLAT_RETENTION_DAYS, so short tail reads (dashboard refresh, forecasts,
+# streaming features) keep working on the flat collection. Full-history
+# readers go through read_range(), which takes buckets up to the last
+# compacted day and flat documents after it. The Parquet mirror syncs flat
+# documents by ingestion time, so old readings written after its last sync
+# are kept until the next one (compact's `keep_ingested_after`).
+
+FLAT_COLLECTION = "karachi_aqi_etl"
+BUCKET_COLLECTION = "karachi_aqi_buckets"
+VALUE_FIELDS = READING_FIELDS[1:]
+
+# "flat" (default) or "bucketed"; readers only consult buckets when bucketed
+STORAGE_LAYOUT = os.getenv("AQI_STORAGE_LAYOUT", "flat")
+FLAT_RETENTION_DAYS = int(os.getenv("AQI_FLAT_RETENTION_DAYS", 35))
+COMPACT_BATCH_DAYS = 100
+
+def is_bucketed():
+    return STORAGE_LAYOUT == "bucketed"
+
+def _day(time):
+    return pd.Timestamp(time).floor("D").to_pydatetime()
+
+def build_bucket(day, readings):
+    """
+    `readings` maps each normalized hour of `day` to its flat document
+    """
+    hours = sorted(readings)
+    bucket = {
+        "_id": day,
+        "count": len(hours),
+        "hours": Binary(np.array([hour.hour for hour in hours], dtype=np.uint8).tobytes()),
+        "summary": {}
+    }
+    for field in VALUE_FIELDS:
+        values = np.array(
+            [readings[hour].get(field) for hour in hours], dtype=np.float64
+        )
+        bucket[field] = Binary(values.astype("<f8").tobytes())
+
+        present = values[~np.isnan(values)]
+        if len(present):
+            bucket["summary"][field] = {
+                "min": float(present.min()),
+                "max": float(present.max()),
+                "mean": float(present.mean()),
+                "count": len(present)
+            }
+    return bucket
+
+def bucket_readings(bucket):
+    """
+    Inverse of build_bucket: hour -> reading dict
+    """
+    day = bucket["_id"]
+    values = {field: np.frombuffer(bucket[field], dtype="<f8") for field in VALUE_FIELDS}
+    readings = {}
+    for i, hour in enumerate(np.frombuffer(bucket["hours"], dtype=np.uint8)):
+        time = day + timedelta(hours=int(hour))
+        readings[time] = {
+            "time": time,
+            **{field: None if np.isnan(values[field][i]) else float(values[field][i]) for field in VALUE_FIELDS}
+        }
+    return readings
+
+def bucket_watermark(buckets):
+    """
+    Start of the first day not covered by buckets, or None before the first
+    compaction
+    """
+    last = buckets.find_one({}, {"_id": 1}, sort=[("_id", DESCENDING)])
+    return None if last is None else last["_id"] + timedelta(days=1)
+
+def _write_days(buckets, days):
+    first, last = min(days), max(days)
+    existing = {
+        bucket["_id"]: bucket
+        for bucket in buckets.find({"_id": {"$gte": first, "$lte": last}})
+    }
+
+    ops = []
+    for day, readings in days.items():
+        # Readings already bucketed stay unless a flat document replaces them
+        merged = bucket_readings(existing[day]) if day in existing else {}
+        merged.update(readings)
+        ops.append(ReplaceOne({"_id": day}, build_bucket(day, merged), upsert=True))
+    with_retry(buckets.bulk_write, ops, ordered=False)
+    return len(ops)
+
+def compact(flat, buckets, retention_days=FLAT_RETENTION_DAYS, batch_days=COMPACT_BATCH_DAYS,
+            keep_ingested_after=None):
+    """
+    Fold flat documents of every closed day into day buckets, then delete
+    flat documents older than `retention_days` before the newest reading,
+    except those ingested after `keep_ingested_after` (the mirror's ingest
+    watermark) that an incremental sync has not read yet.
+    Idempotent: rerunning rebuilds the same buckets from the same readings.
+    """
+    newest = flat.find_one({}, {"time": 1}, sort=[("time", DESCENDING)])
+    if newest is None:
+        return {"buckets": 0, "deleted": 0}
+
+    # The newest reading's day may still receive readings
+    open_day = _day(newest["time"])
+
+    written = 0
+    days = {}
+    cursor = flat.find({"time": {"$lt": open_day}}, {"_id": 0}).sort("time", ASCENDING)
+    for doc in cursor:
+        hour = normalize_hour(doc["time"])
+        day = _day(hour)
+        if day not in days and len(days) >= batch_days:
+            written += _write_days(buckets, days)
+            days = {}
+        days.setdefault(day, {})[hour] = {**doc, "time": hour}
+    if days:
+        written += _write_days(buckets, days)
+
+    cutoff = open_day - timedelta(days=retention_days)
+    expired = {"time": {"$lt": cutoff}}
+    if keep_ingested_after is not None:
+        expired["$or"] = [
+            {INGESTED_FIELD: {"$lte": keep_ingested_after}},
+            {INGESTED_FIELD: {"$exists": False}}
+        ]
+    deleted = flat.delete_many(expired).deleted_count
+
+    print(f"Compacted {written} day buckets, removed {deleted} flat readings")
+    return {"buckets": written, "deleted": deleted}
+
+def read_range(flat, buckets, start=None, end=None, columns=VALUE_FIELDS):
+    """
+    Readings in [start, end] as a time-sorted DataFrame, from buckets up to
+    the bucket watermark and flat documents after it.
+    """
+    start = normalize_hour(start) if start is not None else None
+    end = normalize_hour(end) if end is not None else None
+    watermark = bucket_watermark(buckets)
+    frames = []
+
+    if watermark is not None and (start is None or start < watermark):
+        day_range = {"$lt": watermark}
+        if start is not None:
+            day_range["$gte"] = _day(start)
+        if end is not None:
+            day_range["$lte"] = end
+
+        times = []
+        values = {column: [] for column in columns}
+        projection = {"hours": 1, **{column: 1 for column in columns}}
+        for bucket in buckets.find({"_id": day_range}, projection).sort("_id", ASCENDING):
+            hours = np.frombuffer(bucket["hours"], dtype=np.uint8).astype("timedelta64[h]")
+            times.append(np.datetime64(bucket["_id"], "ns") + hours)
+            for column in columns:
+                values[column].append(np.frombuffer(bucket[column], dtype="<f8"))
+
+        if times:
+            frame = pd.DataFrame({
+                "time": np.concatenate(times),
+                **{column: np.concatenate(chunks) for column, chunks in values.items()}
+            })
+            if start is not None:
+                frame = frame[frame["time"] >= start]
+            if end is not None:
+                frame = frame[frame["time"] <= end]
+            frames.append(frame)
+
+    time_range = {}
+    lower = start
+    if watermark is not None and (lower is None or lower < watermark):
+        lower = watermark
+    if lower is not None:
+        time_range["$gte"] = lower
+    if end is not None:
+        time_range["$lte"] = end
+    query = {"time": time_range} if time_range else {}
+    projection = {"_id": 0, "time": 1, **{column: 1 for column in columns}}
+    flat_frame = pd.DataFrame(list(flat.find(query, projection).sort("time", ASCENDING)), columns=["time", *columns])
+    if not flat_frame.empty:
+        flat_frame["time"] = pd.to_datetime(flat_frame["time"])
+        flat_frame[list(columns)] = flat_frame[list(columns)].astype("float64")
+        frames.append(flat_frame)
+
+    if not frames:
+        return pd.DataFrame(columns=["time", *columns])
+    return pd.concat(frames, ignore_index=True).sort_values("time", kind="stable").reset_index(drop=True)
+
+def aggregate_range(flat, start, end, unit, field="aqi"):
+    """
+    Same rows as data_access.aggregate_readings. In bucketed mode, daily and
+    weekly charts are built from the per-day summaries, and only the flat
+    tail after the bucket watermark is aggregated reading by reading.
+    """
+    buckets = flat.database[BUCKET_COLLECTION]
+    watermark = bucket_watermark(buckets) if is_bucketed() and unit != "hour" else None
+    if watermark is None or normalize_hour(start) >= watermark:
+        return aggregate_readings(flat, start, end, unit, fields=(field,))
+
+    truncate = {"date": "$_id", "unit": unit}
+    if unit == "week":
+        truncate["startOfWeek"] = "monday"
+    summary = f"$summary.{field}"
+    pipeline = [
+        {"$match": {"_id": {"$gte": _day(start), "$lte": normalize_hour(end)}, f"summary.{field}": {"$exists": True}}},
+        {"$group": {
+            "_id": {"$dateTrunc": truncate},
+            "total": {"$sum": {"$multiply": [f"{summary}.mean", f"{summary}.count"]}},
+            f"{field}_max": {"$max": f"{summary}.max"},
+            "count": {"$sum": f"{summary}.count"}
+        }},
+        {"$sort": {"_id": 1}}
+    ]
+    rows = [
+        {
+            "time": row["_id"],
+            f"{field}_mean": row["total"] / row["count"],
+            f"{field}_max": row[f"{field}_max"],
+            "count": row["count"]
+        }
+        for row in buckets.aggregate(pipeline)
+    ]
+
+    tail = []
+    if end is not None and normalize_hour(end) >= watermark:
+        tail = aggregate_readings(flat, watermark, end, unit, fields=(field,))
+    return merge_aggregates(rows, tail, field)
+
+def merge_aggregates(rows, tail, field="aqi"):
+    """
+    Time-sorted union of bucket and flat-tail aggregate rows. A week can
+    straddle the bucket watermark: its two halves are merged, weighted by
+    reading count.
+    """
+    merged = {row["time"]: row for row in rows}
+    for row in tail:
+        previous = merged.get(row["time"])
+        if previous is None:
+            merged[row["time"]] = row
+            continue
+        count = previous["count"] + row["count"]
+        merged[row["time"]] = {
+            "time": row["time"],
+            f"{field}_mean": (previous[f"{field}_mean"] * previous["count"] + row[f"{field}_mean"] * row["count"]) / count,
+            f"{field}_max": max(previous[f"{field}_max"], row[f"{field}_max"]),
+            "count": count
+        }
+    return [merged[time] for time in sorted(merged)]
+
+def layout_stats(flat, buckets):
+    return {
+        "flat_documents": flat.count_documents({}),
+        "bucket_documents": buckets.count_documents({}),
+        "bucketed_readings": sum(b["count"] for b in buckets.find({}, {"count": 1}))
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Day-bucket storage for karachi_aqi_etl")
+    parser.add_argument("command", choices=["compact", "stats"])
+    parser.add_argument("--retention-days", type=int, default=FLAT_RETENTION_DAYS,
+                        help="Flat readings kept after compaction, for tail readers")
+    parser.add_argument("--store-dir", default=None,
+                        help="Parquet mirror whose unsynced readings must survive compaction")
+    args = parser.parse_args()
+
+    db = get_database()
+    flat, buckets = db[FLAT_COLLECTION], db[BUCKET_COLLECTION]
+
+    if args.command == "compact":
+        keep_ingested_after = None
+        if args.store_dir:
+            import feature_store
+
+            # Without a mirror the first sync reads the buckets anyway; a
+            # mirror without an ingest watermark still reads every stamp
+            if feature_store.has_store(args.store_dir):
+                keep_ingested_after = feature_store.read_ingest_watermark(args.store_dir) or datetime.min
+        compact(flat, buckets, args.retention_days, keep_ingested_after=keep_ingested_after)
+    print(layout_stats(flat, buckets))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+# Dashboard chart windows (hours) and resolutions ($dateTrunc unit, bucket
+# hours); only resolutions giving at most MAX_CHART_POINTS buckets are offered
+CHART_RANGES = {
+    "24 hours": 24,
+    "7 days": 24 * 7,
+    "30 days": 24 * 30,
+    "90 days": 24 * 90,
+    "1 year": 24 * 365,
+    "5 years": 24 * 365 * 5
+}
+CHART_RESOLUTIONS = {
+    "Hourly": ("hour", 1),
+    "Daily": ("day", 24),
+    "Weekly": ("week", 24 * 7)
+}
+MAX_CHART_POINTS = 500
+
+def chart_resolutions(range_hours):
+    return [
+        label for label, (_, hours) in CHART_RESOLUTIONS.items()
+        if range_hours / hours <= MAX_CHART_POINTS
+    ]
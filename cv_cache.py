@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import joblib
+import numpy as np
+from sklearn.base import BaseEstimator
+
+# On-disk cache of CV fold scores (<key>.json) and fitted models
+# (<key>.joblib). Keys hash the exact data slice, the feature list, the
+# estimator class and its full parameter set, so a hit is only possible
+# when the fit would be identical. Least recently used entries are evicted
+# once the directory grows past CACHE_MAX_BYTES.
+
+CACHE_DIR = os.getenv("AQI_CV_CACHE_DIR", ".cv_cache")
+CACHE_MAX_BYTES = int(os.getenv("AQI_CV_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+def fingerprint(*arrays):
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.shape}{array.dtype}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def _describe_params(estimator):
+    described = {}
+    for name, value in estimator.get_params(deep=True).items():
+        if isinstance(value, BaseEstimator):
+            value = f"{type(value).__module__}.{type(value).__qualname__}"
+        described[name] = repr(value)
+    return described
+
+def make_key(kind, data_fingerprint, features, estimator):
+    """
+    `estimator` must already carry the params being evaluated
+    """
+    payload = {
+        "kind": kind,
+        "data": data_fingerprint,
+        "features": list(features) if features is not None else None,
+        "class": f"{type(estimator).__module__}.{type(estimator).__qualname__}",
+        "params": _describe_params(estimator)
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+def _path(key, suffix, cache_dir):
+    return os.path.join(cache_dir, key + suffix)
+
+def _touch(path):
+    # mtime doubles as the LRU access time
+    os.utime(path)
+
+def _write_atomic(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def get_score(key, cache_dir=CACHE_DIR):
+    path = _path(key, ".json", cache_dir)
+    if not os.path.exists(path):
+        return None
+    _touch(path)
+    with open(path) as f:
+        return json.load(f)["score"]
+
+def put_score(key, score, cache_dir=CACHE_DIR):
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump({"score": float(score)}, f)
+    _write_atomic(_path(key, ".json", cache_dir), write)
+
+def get_model(key, cache_dir=CACHE_DIR):
+    path = _path(key, ".joblib", cache_dir)
+    if not os.path.exists(path):
+        return None
+    _touch(path)
+    return joblib.load(path)
+
+def put_model(key, model, cache_dir=CACHE_DIR):
+    _write_atomic(_path(key, ".joblib", cache_dir), lambda tmp_path: joblib.dump(model, tmp_path))
+
+def evict(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith((".json", ".joblib")):
+            stat = os.stat(os.path.join(cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(os.path.join(cache_dir, name))
+        total -= size
+        evicted += 1
+    return evicted
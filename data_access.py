@@ -0,0 +1,309 @@
+import argparse
+import atexit
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from pymongo import MongoClient, UpdateOne, DeleteOne, ASCENDING, DESCENDING
+from pymongo.errors import ConnectionFailure, OperationFailure
+import instrumentation
+
+UPSERT_BATCH_SIZE = int(os.getenv("AQI_UPSERT_BATCH_SIZE", 1000))
+
+DATABASE = "aqi_data"
+READINGS_COLLECTION = "karachi_aqi_etl"
+# Multi-city mode: every city lands in one collection keyed on (city, time)
+CITY_COLLECTION = "city_aqi_etl"
+CITY_KEY_FIELDS = ("city", "time")
+
+# Every stored reading field; `_id` is never shipped
+READING_PROJECTION = {
+    "_id": 0, "time": 1, "co": 1, "no2": 1, "o3": 1,
+    "pm10": 1, "pm2_5": 1, "so2": 1, "aqi": 1
+}
+# The same fields as a column list, `time` first
+READING_FIELDS = [name for name, include in READING_PROJECTION.items() if include]
+
+# Stamped by upsert_readings on every inserted or changed reading (naive
+# UTC), so incremental readers also see late backfills and corrections
+INGESTED_FIELD = "ingested_at"
+
+# Pool settings for the shared client. Scripts make a handful of requests
+# each, the dashboard and the forecast service a steady trickle.
+MAX_POOL_SIZE = int(os.getenv("AQI_MONGO_MAX_POOL_SIZE", 20))
+MIN_POOL_SIZE = int(os.getenv("AQI_MONGO_MIN_POOL_SIZE", 0))
+MAX_IDLE_TIME_MS = 5 * 60 * 1000
+CONNECT_TIMEOUT_MS = 5000
+SERVER_SELECTION_TIMEOUT_MS = 10000
+SOCKET_TIMEOUT_MS = 60000
+# Wire compression, e.g. "zstd,zlib" (zstd needs the zstandard package)
+COMPRESSORS = os.getenv("AQI_MONGO_COMPRESSORS", "")
+
+RETRIES = 3
+RETRY_BACKOFF = 0.5
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(uri=None):
+    """
+    Process-wide pooled client for `uri` (default: MONGO_URI). Thread safe;
+    a forked child gets its own client instead of inheriting the parent's
+    sockets.
+    """
+    uri = uri or os.getenv("MONGO_URI")
+    key = (uri, os.getpid())
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                options = {
+                    "maxPoolSize": MAX_POOL_SIZE,
+                    "minPoolSize": MIN_POOL_SIZE,
+                    "maxIdleTimeMS": MAX_IDLE_TIME_MS,
+                    "connectTimeoutMS": CONNECT_TIMEOUT_MS,
+                    "serverSelectionTimeoutMS": SERVER_SELECTION_TIMEOUT_MS,
+                    "socketTimeoutMS": SOCKET_TIMEOUT_MS,
+                    "retryWrites": True,
+                    "retryReads": True
+                }
+                if COMPRESSORS:
+                    options["compressors"] = COMPRESSORS
+                client = MongoClient(uri, **options)
+                _clients[key] = client
+    return client
+
+def get_database(uri=None):
+    return get_client(uri)[DATABASE]
+
+def get_collection(name=READINGS_COLLECTION, uri=None):
+    return get_database(uri)[name]
+
+@atexit.register
+def close_clients():
+    with _clients_lock:
+        for (_, pid), client in list(_clients.items()):
+            if pid == os.getpid():
+                client.close()
+        _clients.clear()
+
+def with_retry(operation, *args, retries=RETRIES, backoff=RETRY_BACKOFF, **kwargs):
+    """
+    Call `operation`, retrying connection failures with exponential
+    backoff. Only for idempotent reads and upserts.
+    """
+    for attempt in range(retries):
+        try:
+            return operation(*args, **kwargs)
+        except ConnectionFailure:
+            if attempt == retries - 1:
+                raise
+            instrumentation.count("retries")
+            time.sleep(backoff * 2 ** attempt)
+
+def latest_readings(collection, n, projection=READING_PROJECTION, query=None):
+    """
+    Newest `n` readings matching `query`, oldest first
+    """
+    def fetch():
+        cursor = collection.find(query or {}, projection).sort("time", DESCENDING).limit(n)
+        return list(cursor)[::-1]
+    return with_retry(fetch)
+
+def scan_range(collection, after=None, until=None, projection=READING_PROJECTION, query=None, batch_size=None):
+    """
+    Cursor over readings with after < time <= until (either bound
+    optional), oldest first
+    """
+    time_range = {}
+    if after is not None:
+        time_range["$gt"] = after
+    if until is not None:
+        time_range["$lte"] = until
+    query = dict(query or {})
+    if time_range:
+        query["time"] = time_range
+
+    cursor = collection.find(query, projection).sort("time", ASCENDING)
+    if batch_size:
+        cursor = cursor.batch_size(batch_size)
+    return cursor
+
+# Readings stamped this long before a reader's last fetch are read again,
+# in case a write committed late or a writer's clock runs behind
+INGEST_LAG = timedelta(minutes=10)
+
+def scan_changes(collection, ingested_since=None, watermark=None, projection=READING_PROJECTION,
+                 query=None, batch_size=None):
+    """
+    Cursor over readings inserted or changed after `ingested_since`, whatever
+    their `time` (backfills, late ETL flushes, corrected hours), plus
+    readings written before ingestion stamps existed with time >
+    `watermark`; oldest first. Readers deduplicate re-read hours by `time`.
+    """
+    since = datetime.min if ingested_since is None else ingested_since - INGEST_LAG
+    unstamped = {INGESTED_FIELD: {"$exists": False}}
+    if watermark is not None:
+        unstamped["time"] = {"$gt": watermark}
+    query = {**(query or {}), "$or": [{INGESTED_FIELD: {"$gt": since}}, unstamped]}
+
+    cursor = collection.find(query, projection).sort("time", ASCENDING)
+    if batch_size:
+        cursor = cursor.batch_size(batch_size)
+    return cursor
+
+def utc_now():
+    # Naive UTC, the form INGESTED_FIELD is stored in
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def normalize_hour(time):
+    """
+    Floor a timestamp to the hour as a naive UTC datetime, the form every
+    reading's `time` is stored and indexed in.
+    """
+    time = pd.Timestamp(time)
+    if time.tzinfo is not None:
+        time = time.tz_convert("UTC").tz_localize(None)
+    return time.floor("h").to_pydatetime()
+
+def ensure_time_index(collection, key_fields=("time",)):
+    """
+    Unique index on the reading key: the hour alone for single-city
+    collections, (city, time) for the multi-city one.
+    """
+    try:
+        collection.create_index(
+            [(field, ASCENDING) for field in key_fields],
+            unique=True,
+            name="_".join(key_fields) + "_unique"
+        )
+    except OperationFailure as e:
+        raise RuntimeError(
+            "Duplicate hours found; run `python data_access.py dedupe` first"
+        ) from e
+
+def ensure_ingest_index(collection):
+    collection.create_index([(INGESTED_FIELD, ASCENDING)], name=INGESTED_FIELD)
+
+def _same(a, b):
+    # Missing values read back as NaN compare equal to themselves here
+    return a == b or (a != a and b != b)
+
+def upsert_readings(collection, records, batch_size=UPSERT_BATCH_SIZE, key_fields=("time",)):
+    """
+    Idempotent unordered bulk upserts keyed on the normalized hour (plus
+    any other `key_fields`, e.g. city). Each batch is compared with the
+    stored readings first; only new or changed ones are written, stamped
+    with INGESTED_FIELD.
+    Returns inserted / updated / skipped counts; a record is skipped when it
+    repeats a key within the same call or matches the stored reading.
+    """
+    counts = {"inserted": 0, "updated": 0, "skipped": 0}
+
+    # Last record wins for repeated keys within the call
+    by_key = {}
+    for record in records:
+        doc = {**record, "time": normalize_hour(record["time"])}
+        key = tuple(doc[field] for field in key_fields)
+        if key in by_key:
+            counts["skipped"] += 1
+        by_key[key] = doc
+
+    docs = list(by_key.values())
+    for start in range(0, len(docs), batch_size):
+        batch = docs[start:start + batch_size]
+        query = {field: {"$in": list({doc[field] for doc in batch})} for field in key_fields}
+        stored = {
+            tuple(doc[field] for field in key_fields): doc
+            for doc in with_retry(lambda: list(collection.find(query, {"_id": 0, INGESTED_FIELD: 0})))
+        }
+
+        ingested_at = utc_now()
+        ops = []
+        for doc in batch:
+            previous = stored.get(tuple(doc[field] for field in key_fields))
+            if previous is not None and all(_same(value, previous.get(name)) for name, value in doc.items()):
+                counts["skipped"] += 1
+                continue
+            ops.append(UpdateOne(
+                {field: doc[field] for field in key_fields},
+                {"$set": {**doc, INGESTED_FIELD: ingested_at}},
+                upsert=True
+            ))
+        if not ops:
+            continue
+
+        # Upserts keyed on the reading are safe to replay after a dropped connection
+        result = with_retry(collection.bulk_write, ops, ordered=False)
+        counts["inserted"] += result.upserted_count
+        counts["updated"] += result.modified_count
+        counts["skipped"] += result.matched_count - result.modified_count
+
+    return counts
+
+def aggregate_readings(collection, start, end, unit, fields=("aqi",)):
+    """
+    Server-side downsampling for charts: mean and max of each field per
+    `unit` bucket ("hour", "day" or "week", weeks starting Monday) over
+    readings in [start, end]. The $match runs on the unique time index.
+    Returns one {"time", "<field>_mean", "<field>_max", "count"} per bucket.
+    """
+    truncate = {"date": "$time", "unit": unit}
+    if unit == "week":
+        truncate["startOfWeek"] = "monday"
+
+    group = {"_id": {"$dateTrunc": truncate}, "count": {"$sum": 1}}
+    for field in fields:
+        group[f"{field}_mean"] = {"$avg": f"${field}"}
+        group[f"{field}_max"] = {"$max": f"${field}"}
+
+    pipeline = [
+        {"$match": {"time": {"$gte": normalize_hour(start), "$lte": normalize_hour(end)}}},
+        {"$group": group},
+        {"$sort": {"_id": 1}},
+        {"$project": {"_id": 0, "time": "$_id", **{name: 1 for name in group if name != "_id"}}}
+    ]
+    return with_retry(lambda: list(collection.aggregate(pipeline)))
+
+def deduplicate_hours(collection):
+    """
+    One-off migration for data written before the unique index: normalize
+    every `time` to the hour and keep only the newest document per hour.
+    """
+    newest = {}
+    ops = []
+    for doc in collection.find({}, {"time": 1}).sort("_id", ASCENDING):
+        hour = normalize_hour(doc["time"])
+        if hour in newest:
+            ops.append(DeleteOne({"_id": newest[hour]}))
+        newest[hour] = doc["_id"]
+        if doc["time"] != hour:
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"time": hour}}))
+
+    # Deletes first so no two surviving documents share an hour
+    ops.sort(key=lambda op: not isinstance(op, DeleteOne))
+    if ops:
+        collection.bulk_write(ops, ordered=True)
+
+    deleted = sum(isinstance(op, DeleteOne) for op in ops)
+    print(f"Removed {deleted} duplicate readings")
+    return deleted
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="karachi_aqi_etl maintenance")
+    parser.add_argument("command", choices=["dedupe"])
+    args = parser.parse_args()
+
+    collection = get_collection()
+
+    if args.command == "dedupe":
+        deduplicate_hours(collection)
+        ensure_time_index(collection)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,47 @@
 import pandas as pd 
 import requests
 import os
-from pymongo import MongoClient
+import argparse
+import asyncio
+import aiohttp
+from pymongo.errors import PyMongoError
+import etl_buffer
+import instrumentation
+from data_access import CITY_COLLECTION, CITY_KEY_FIELDS, ensure_time_index, get_database
+from streaming_features import update_streaming_features
+
+URL='https://api.api-ninjas.com/v1/airquality'
+
+KARACHI_COLLECTION='karachi_aqi_etl'
+
+CONCURRENCY=int(os.getenv('AQI_ETL_CONCURRENCY',10))
+REQUEST_TIMEOUT=10
+RETRIES=3
+RETRY_BACKOFF=0.5
+
+# api-ninjas field -> stored field
+FIELD_MAP={
+     'CO.concentration':'co',
+     'NO2.concentration':'no2',
+     'O3.concentration':'o3',
+     'PM10.concentration':'pm10',
+     'PM2.5.concentration':'pm2_5',
+     'SO2.concentration':'so2',
+     'overall_aqi':'aqi'
+}
 
 def extract_data(url):
      API_Key=os.getenv('_API_NINJA_KEY_')
      header={"X-Api-Key":API_Key}
      param={'city':'Karachi'}
      response=requests.get(url,headers=header,params=param)
+     instrumentation.count('bytes',len(response.content))
      data=response.json()
      return data
 
 def transform_data(data):
       
-     time=pd.Timestamp.now()
+     time=pd.Timestamp.now().floor('h')
      CO=data['CO']['concentration']
      No2=data['NO2']['concentration']
      O3=data['O3']['concentration']
@@ -28,16 +56,122 @@ def transform_data(data):
      
      return aqi_df.to_dict(orient="records")[0]
 
+def flush_buffer(force=False):
+     """
+     Write buffered readings to MongoDB once a flush is due (or always
+     when `force`). On a MongoDB failure the readings stay buffered for
+     the next run.
+     """
+     if not (etl_buffer.flush_due() or (force and etl_buffer.pending()[0])):
+          return
+     db=get_database()
+
+     def after_batch(collection,records):
+          instrumentation.count('rows',len(records),collection=collection)
+          if collection==KARACHI_COLLECTION:
+               for record in records:
+                    update_streaming_features(db,record)
+
+     try:
+          ensure_time_index(db[KARACHI_COLLECTION])
+          ensure_time_index(db[CITY_COLLECTION],key_fields=CITY_KEY_FIELDS)
+          flushed=etl_buffer.flush(db,on_batch=after_batch)
+     except PyMongoError as e:
+          instrumentation.count('failed_flushes')
+          print(f"Flush failed, {etl_buffer.pending()[0]} readings kept in {etl_buffer.BUFFER_PATH}: {e!r}")
+          return
+     for collection,counts in flushed.items():
+          print(f"Flushed {collection}: {counts}")
+
 def load_data(data_dict):
-     mongo_uri=os.getenv("MONGO_URI")
-     client = MongoClient(mongo_uri)
-     db=client['aqi_data']
-     collection=db['karachi_aqi_etl']
-     collection.insert_one(data_dict)
-     
+     etl_buffer.append(KARACHI_COLLECTION,[data_dict])
+     print(f"Buffered reading for {data_dict['time']}")
+     flush_buffer()
+
+async def fetch_city(session,semaphore,url,city):
+     async with semaphore:
+          for attempt in range(RETRIES):
+               try:
+                    async with session.get(url,params={'city':city}) as response:
+                         response.raise_for_status()
+                         instrumentation.count('bytes',len(await response.read()))
+                         return city,await response.json()
+               except (aiohttp.ClientError,asyncio.TimeoutError) as e:
+                    # Only timeouts, dropped connections and 5xx are transient;
+                    # a 4xx (bad key, unknown city) fails the same way every time
+                    retryable=not isinstance(e,aiohttp.ClientResponseError) or e.status>=500
+                    if not retryable or attempt==RETRIES-1:
+                         print(f"{city}: giving up after {attempt+1} attempts ({e!r})")
+                         instrumentation.count('failed_requests')
+                         return city,None
+                    instrumentation.count('retries')
+                    await asyncio.sleep(RETRY_BACKOFF*2**attempt)
+
+async def extract_cities(url,cities,concurrency=CONCURRENCY):
+     """
+     Fetch every city concurrently over one pooled session; at most
+     `concurrency` requests are in flight, each with its own timeout.
+     """
+     header={"X-Api-Key":os.getenv('_API_NINJA_KEY_','')}
+     semaphore=asyncio.Semaphore(concurrency)
+     connector=aiohttp.TCPConnector(limit=concurrency)
+     timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+     async with aiohttp.ClientSession(headers=header,connector=connector,timeout=timeout) as session:
+          return await asyncio.gather(*(fetch_city(session,semaphore,url,city) for city in cities))
+
+def transform_cities(results):
+     # One vectorized pass over every successful response
+     ok=[(city,data) for city,data in results if data is not None]
+     if not ok:
+          return []
+     cities,payloads=zip(*ok)
+     aqi_df=pd.json_normalize(list(payloads)).reindex(columns=list(FIELD_MAP)).rename(columns=FIELD_MAP)
+     aqi_df.insert(0,'time',pd.Timestamp.now().floor('h'))
+     aqi_df.insert(0,'city',list(cities))
+     return aqi_df.to_dict(orient="records")
+
+def load_cities(records):
+     etl_buffer.append(CITY_COLLECTION,records,key_fields=CITY_KEY_FIELDS)
+     # Karachi also feeds the single-city pipeline the model is trained on
+     karachi=[{k:v for k,v in record.items() if k!='city'} for record in records if record['city']=='Karachi']
+     etl_buffer.append(KARACHI_COLLECTION,karachi)
+     print(f"Buffered {len(records)} city readings")
+     flush_buffer()
+
+def run_cities(cities):
+     with instrumentation.span('extract',cities=len(cities)):
+          results=asyncio.run(extract_cities(URL,cities))
+     with instrumentation.span('transform'):
+          records=transform_cities(results)
+     with instrumentation.span('load'):
+          load_cities(records)
+
+
+def main():
+     parser=argparse.ArgumentParser(description="Hourly AQI ETL")
+     parser.add_argument('--cities',default=os.getenv('AQI_ETL_CITIES'),
+                         help="Comma-separated city list; enables the concurrent multi-city mode")
+     parser.add_argument('--flush',action='store_true',
+                         help="Only flush buffered readings to MongoDB, without extracting")
+     args=parser.parse_args()
 
+     with instrumentation.span('etl'):
+          if args.flush:
+               with instrumentation.span('load'):
+                    flush_buffer(force=True)
+          elif args.cities:
+               run_cities([city.strip() for city in args.cities.split(',') if city.strip()])
+          else:
+               with instrumentation.span('extract'):
+                    extract=extract_data(URL)
+               with instrumentation.span('transform'):
+                    transformed=transform_data(extract)
+               with instrumentation.span('load'):
+                    load_data(transformed)
 
 
-extract=extract_data('https://api.api-ninjas.com/v1/airquality')
-transformed=transform_data(extract)
-load_data(transformed)
\ No newline at end of file
+if __name__ == "__main__":
+     try:
+          main()
+     finally:
+          instrumentation.export()
@@ -0,0 +1,125 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from data_access import normalize_hour, upsert_readings
+
+# Durable local write-ahead buffer for the ETL. Each run appends its
+# readings to a SQLite file (WAL, synchronous=FULL) before MongoDB is
+# touched, so an unreachable or slow cluster never loses an hourly reading.
+# flush() upserts everything pending in time order through
+# data_access.upsert_readings and only then drops the flushed rows, so a
+# flush interrupted halfway is simply replayed by the next one.
+#
+#   CREATE TABLE readings (
+#       id INTEGER PRIMARY KEY, collection TEXT, key TEXT, key_fields TEXT,
+#       doc TEXT, buffered_at REAL, UNIQUE (collection, key))
+#
+# A reading buffered twice for the same key (a rerun of the same hour)
+# replaces the pending one, matching upsert_readings' last-record-wins.
+
+BUFFER_PATH = os.getenv("AQI_ETL_BUFFER_PATH", ".etl_buffer.sqlite3")
+# A flush is due once this many readings are pending, or the oldest has
+# waited FLUSH_AGE_SECONDS. The defaults flush on every hourly run; raise
+# them to batch frequent or multi-city runs into fewer round trips.
+FLUSH_ROWS = int(os.getenv("AQI_ETL_FLUSH_ROWS", 1))
+FLUSH_AGE_SECONDS = int(os.getenv("AQI_ETL_FLUSH_AGE_SECONDS", 3600))
+FLUSH_BATCH_SIZE = 1000
+
+def connect(path=BUFFER_PATH):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS readings (
+            id INTEGER PRIMARY KEY,
+            collection TEXT NOT NULL,
+            key TEXT NOT NULL,
+            key_fields TEXT NOT NULL,
+            doc TEXT NOT NULL,
+            buffered_at REAL NOT NULL,
+            UNIQUE (collection, key)
+        )
+    """)
+    return conn
+
+def _encode(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    # numpy scalars
+    return value.item()
+
+def append(collection, records, key_fields=("time",), path=BUFFER_PATH):
+    """
+    Durably buffer `records` for `collection`; returns once they are on disk
+    """
+    rows = []
+    now = time.time()
+    for record in records:
+        doc = {**record, "time": normalize_hour(record["time"])}
+        key = json.dumps([doc[field] for field in key_fields], default=_encode)
+        rows.append((collection, key, json.dumps(list(key_fields)), json.dumps(doc, default=_encode), now))
+
+    with closing(connect(path)) as conn, conn:
+        conn.executemany(
+            """
+            INSERT INTO readings (collection, key, key_fields, doc, buffered_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (collection, key) DO UPDATE SET doc = excluded.doc, buffered_at = excluded.buffered_at
+            """,
+            rows
+        )
+    return len(rows)
+
+def pending(path=BUFFER_PATH):
+    """
+    (pending readings, age in seconds of the oldest one)
+    """
+    with closing(connect(path)) as conn:
+        rows, oldest = conn.execute("SELECT COUNT(*), MIN(buffered_at) FROM readings").fetchone()
+    return rows, 0.0 if oldest is None else time.time() - oldest
+
+def flush_due(path=BUFFER_PATH, min_rows=FLUSH_ROWS, max_age=FLUSH_AGE_SECONDS):
+    rows, age = pending(path)
+    return rows > 0 and (rows >= min_rows or age >= max_age)
+
+def flush(db, on_batch=None, path=BUFFER_PATH, batch_size=FLUSH_BATCH_SIZE):
+    """
+    Upsert every pending reading into `db`, oldest first, in batches of
+    `batch_size` per collection. `on_batch(collection, records)` runs after
+    each batch is written and before it leaves the buffer. A failure stops
+    the flush with the unflushed readings still buffered; rerunning is safe.
+    Returns {collection: upsert counts}.
+    """
+    flushed = {}
+    with closing(connect(path)) as conn:
+        collections = [row[0] for row in conn.execute("SELECT DISTINCT collection FROM readings")]
+        for name in collections:
+            rows = conn.execute(
+                "SELECT id, key_fields, doc FROM readings WHERE collection = ?", (name,)
+            ).fetchall()
+            entries = []
+            for row_id, key_fields, doc in rows:
+                record = json.loads(doc)
+                record["time"] = normalize_hour(record["time"])
+                entries.append((row_id, tuple(json.loads(key_fields)), doc, record))
+            entries.sort(key=lambda entry: entry[3]["time"])
+
+            counts = flushed.setdefault(name, {"inserted": 0, "updated": 0, "skipped": 0})
+            for start in range(0, len(entries), batch_size):
+                batch = entries[start:start + batch_size]
+                records = [record for _, _, _, record in batch]
+                result = upsert_readings(db[name], records, key_fields=batch[0][1])
+                for field, value in result.items():
+                    counts[field] += value
+                if on_batch is not None:
+                    on_batch(name, records)
+
+                # A reading re-buffered during the flush changed its doc and stays
+                with conn:
+                    conn.executemany(
+                        "DELETE FROM readings WHERE id = ? AND doc = ?",
+                        [(row_id, doc) for row_id, _, doc, _ in batch]
+                    )
+    return flushed
@@ -0,0 +1,83 @@
+import pandas as pd
+
+# Shared by model_training.py (batch mode) and the serving paths
+# (incremental mode), so training and inference features cannot drift apart.
+FEATURES = [
+    "co", "no2", "o3", "pm10", "pm2_5", "so2",
+    "hour", "day", "dayofweek", "month", "aqi_change_rate"
+]
+
+TARGETS = ["aqi_t+1", "aqi_t+2", "aqi_t+3"]
+
+# Hours ahead for each target (aqi_t+1, aqi_t+2, aqi_t+3)
+HORIZON_HOURS = [24, 48, 72]
+
+# Rows of history a feature row depends on: aqi_change_rate is a 1-step diff
+CONTEXT_ROWS = 1
+
+# Tail scanned when looking for the newest complete feature row
+LATEST_LOOKBACK_ROWS = 24
+
+def build_features(df):
+    """
+    Batch mode: features for every row. Returns a new time-sorted frame.
+    """
+    df = df.copy()
+    df["time"] = pd.to_datetime(df["time"])
+    df = df.sort_values("time", kind="stable")
+
+    df["hour"] = df["time"].dt.hour
+    df["day"] = df["time"].dt.day
+    df["dayofweek"] = df["time"].dt.dayofweek
+    df["month"] = df["time"].dt.month
+
+    df["aqi_change_rate"] = df["aqi"].diff()
+
+    return df
+
+def build_training_frame(df):
+    df = build_features(df)
+
+    # Multi-step forecasting
+    for target, hours in zip(TARGETS, HORIZON_HOURS):
+        df[target] = df["aqi"].shift(-hours)
+
+    df.dropna(inplace=True)
+
+    return df
+
+def build_incremental_features(context, n=1):
+    """
+    Incremental mode: features for the newest `n` rows of a time-sorted
+    `context`, touching only n + CONTEXT_ROWS rows. The result equals the
+    last `n` rows of build_features(context) exactly.
+    """
+    return build_features(context.tail(n + CONTEXT_ROWS)).tail(n)
+
+def latest_feature_row(context, lookback=LATEST_LOOKBACK_ROWS):
+    # Newest row with every feature present, as a 1-row frame
+    rows = build_incremental_features(context, lookback).dropna(subset=FEATURES)
+    return rows.iloc[-1:]
+
+# Richer temporal features, maintained in O(1) per reading by
+# streaming_features.py; build_rolling_features is the batch equivalent
+ROLLING_WINDOWS = [24, 72]
+EWMA_SPAN = 24
+
+ROLLING_FEATURES = (
+    ["aqi_lag_24"]
+    + [f"aqi_mean_{w}h" for w in ROLLING_WINDOWS]
+    + [f"aqi_max_{w}h" for w in ROLLING_WINDOWS]
+    + [f"aqi_ewma_{EWMA_SPAN}h"]
+)
+
+def build_rolling_features(df):
+    df = build_features(df)
+
+    df["aqi_lag_24"] = df["aqi"].shift(24)
+    for w in ROLLING_WINDOWS:
+        df[f"aqi_mean_{w}h"] = df["aqi"].rolling(w).mean()
+        df[f"aqi_max_{w}h"] = df["aqi"].rolling(w).max()
+    df[f"aqi_ewma_{EWMA_SPAN}h"] = df["aqi"].ewm(span=EWMA_SPAN, adjust=False).mean()
+
+    return df
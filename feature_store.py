@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pymongo import ASCENDING
+import bucket_store
+import data_access
+
+# Local, month-partitioned Parquet mirror of aqi_data.karachi_aqi_etl:
+#   <store dir>/karachi_aqi_etl/month=YYYY-MM/data.parquet
+#   <store dir>/karachi_aqi_etl/_watermark.json
+# The watermark holds the newest mirrored reading time and the ingestion
+# time (data_access.INGESTED_FIELD) of the last sync. Incremental syncs
+# pull every reading written since then, whatever its `time`, so late
+# backfills, buffered ETL flushes and corrected hours all reach the mirror.
+STORE_DIR = os.getenv("AQI_FEATURE_STORE_DIR", "feature_store")
+COLLECTION = "karachi_aqi_etl"
+
+MODEL_COLUMNS = data_access.READING_FIELDS
+PROJECTION = data_access.READING_PROJECTION
+
+SCHEMA = pa.schema(
+    [("time", pa.timestamp("ns"))] + [(name, pa.float64()) for name in MODEL_COLUMNS[1:]]
+)
+
+SYNC_BATCH_SIZE = 10000
+
+def dataset_path(store_dir=STORE_DIR):
+    return os.path.join(store_dir, COLLECTION)
+
+def has_store(store_dir=STORE_DIR):
+    return read_watermark(store_dir) is not None
+
+def _read_state(store_dir):
+    path = os.path.join(dataset_path(store_dir), "_watermark.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {key: pd.Timestamp(value).to_pydatetime() for key, value in json.load(f).items()}
+
+def read_watermark(store_dir=STORE_DIR):
+    # Newest reading time in the mirror
+    return _read_state(store_dir).get("time")
+
+def read_ingest_watermark(store_dir=STORE_DIR):
+    # Start of the last completed sync; None for mirrors written before
+    # readings were stamped
+    return _read_state(store_dir).get("ingested_at")
+
+def write_watermark(watermark, store_dir=STORE_DIR, ingested_at=None):
+    state = {"time": pd.Timestamp(watermark).isoformat()}
+    if ingested_at is not None:
+        state["ingested_at"] = pd.Timestamp(ingested_at).isoformat()
+
+    root = dataset_path(store_dir)
+    tmp_path = os.path.join(root, "._watermark.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, os.path.join(root, "_watermark.json"))
+
+def _write_month(month, df, store_dir):
+    """
+    Merge new rows into a month partition and rewrite it as one file.
+    Partitions are ~720 rows per city, so the rewrite is cheap and keeps
+    reruns idempotent (duplicate hours are dropped, newest wins).
+    """
+    month_dir = os.path.join(dataset_path(store_dir), f"month={month}")
+    os.makedirs(month_dir, exist_ok=True)
+    path = os.path.join(month_dir, "data.parquet")
+
+    if os.path.exists(path):
+        df = pd.concat([pq.read_table(path).to_pandas(), df], ignore_index=True)
+    df = df.drop_duplicates("time", keep="last").sort_values("time")
+
+    tmp_path = os.path.join(month_dir, ".data.parquet.tmp")
+    pq.write_table(pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False), tmp_path)
+    os.replace(tmp_path, path)
+
+def _write_batch(docs, store_dir):
+    df = pd.DataFrame(docs, columns=MODEL_COLUMNS)
+    df["time"] = pd.to_datetime(df["time"])
+    df[MODEL_COLUMNS[1:]] = df[MODEL_COLUMNS[1:]].astype("float64")
+
+    for month, part in df.groupby(df["time"].dt.strftime("%Y-%m")):
+        _write_month(month, part, store_dir)
+
+    # Advance the watermark only after the partitions are on disk; batches
+    # of late or corrected readings can be older than the mirror
+    state = _read_state(store_dir)
+    watermark = max(filter(None, [state.get("time"), df["time"].max().to_pydatetime()]))
+    write_watermark(watermark, store_dir, state.get("ingested_at"))
+
+def sync(collection, store_dir=STORE_DIR, batch_size=SYNC_BATCH_SIZE, full=False):
+    """
+    Merge every reading written since the last sync into the mirror: new
+    hours as well as backfilled or corrected older ones.
+    """
+    os.makedirs(dataset_path(store_dir), exist_ok=True)
+    state = {} if full else _read_state(store_dir)
+    watermark = state.get("time")
+    sync_started = data_access.utc_now()
+
+    if watermark is None and bucket_store.is_bucketed():
+        # Compacted history is only in the day buckets
+        df = bucket_store.read_range(collection, collection.database[bucket_store.BUCKET_COLLECTION])
+        for start in range(0, len(df), batch_size):
+            _write_batch(df.iloc[start:start + batch_size], store_dir)
+        if len(df):
+            write_watermark(read_watermark(store_dir), store_dir, sync_started)
+        print(f"Synced {len(df)} rows into {dataset_path(store_dir)}")
+        return len(df)
+
+    if watermark is None:
+        cursor = collection.find({}, PROJECTION, batch_size=batch_size).sort("time", ASCENDING)
+    else:
+        # Hours re-read within data_access.INGEST_LAG are deduplicated per partition
+        data_access.ensure_ingest_index(collection)
+        cursor = data_access.scan_changes(
+            collection, state.get("ingested_at"), watermark, PROJECTION, batch_size=batch_size
+        )
+
+    rows = 0
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            _write_batch(batch, store_dir)
+            rows += len(batch)
+            batch = []
+    if batch:
+        _write_batch(batch, store_dir)
+        rows += len(batch)
+
+    if read_watermark(store_dir) is not None:
+        write_watermark(read_watermark(store_dir), store_dir, sync_started)
+    print(f"Synced {rows} new or changed rows into {dataset_path(store_dir)}")
+    return rows
+
+def sync_from_uri(mongo_uri, store_dir=STORE_DIR, full=False):
+    return sync(data_access.get_database(mongo_uri)[COLLECTION], store_dir, full=full)
+
+def read_store(store_dir=STORE_DIR, start=None, end=None, columns=None):
+    """
+    Read the mirror as a DataFrame sorted by time. `start`/`end` are pushed
+    down to the scan: month partitions outside the range are pruned and
+    Parquet row-group statistics skip the rest.
+    """
+    dataset = ds.dataset(dataset_path(store_dir), format="parquet", partitioning="hive")
+
+    conditions = []
+    if start is not None:
+        start = pd.Timestamp(start)
+        conditions += [ds.field("month") >= start.strftime("%Y-%m"), ds.field("time") >= start]
+    if end is not None:
+        end = pd.Timestamp(end)
+        conditions += [ds.field("month") <= end.strftime("%Y-%m"), ds.field("time") <= end]
+
+    row_filter = None
+    for condition in conditions:
+        row_filter = condition if row_filter is None else row_filter & condition
+
+    table = dataset.to_table(columns=columns or MODEL_COLUMNS, filter=row_filter)
+    return table.to_pandas().sort_values("time").reset_index(drop=True)
+
+def read_tail(rows, store_dir=STORE_DIR):
+    # Newest `rows` hourly readings; only the last few partitions are scanned
+    watermark = read_watermark(store_dir)
+    if watermark is None:
+        return pd.DataFrame(columns=MODEL_COLUMNS)
+    df = read_store(store_dir, start=pd.Timestamp(watermark) - pd.Timedelta(hours=rows))
+    return df.tail(rows).reset_index(drop=True)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Local Parquet mirror of karachi_aqi_etl")
+    parser.add_argument("command", choices=["sync"])
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    parser.add_argument("--full", action="store_true", help="Resync from scratch, ignoring the watermark")
+    args = parser.parse_args()
+
+    sync_from_uri(os.getenv("MONGO_URI"), args.store_dir, full=args.full)
+
+
+if __name__ == "__main__":
+    main()
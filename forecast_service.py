@@ -0,0 +1,362 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from aiohttp import web
+import model_cache
+import prediction_intervals
+import tree_runtime
+from data_access import (
+    CITY_COLLECTION, READING_PROJECTION, READINGS_COLLECTION, get_database, latest_readings, normalize_hour
+)
+from feature_engine import FEATURES, HORIZON_HOURS, LATEST_LOOKBACK_ROWS, latest_feature_row
+
+# Standalone HTTP forecast service:
+#
+#   GET /forecast?city=Karachi&at=2025-01-01T12:00   ->  3-day forecast (JSON)
+#   GET /stats                                       ->  latency / batching counters
+#   GET /health
+#
+# The model is loaded once and swapped in place when a new version is
+# registered. Concurrent cache misses are coalesced into one predict call per
+# BATCH_WINDOW, and responses are cached keyed by (city, input watermark,
+# model version), so repeated requests between ETL runs never touch the model.
+
+DEFAULT_CITY = "Karachi"
+# Karachi readings live in the single-city collection the model is trained on
+KARACHI_COLLECTION = READINGS_COLLECTION
+
+CONTEXT_ROWS = LATEST_LOOKBACK_ROWS + 1
+
+BATCH_WINDOW = float(os.getenv("AQI_SERVICE_BATCH_WINDOW_MS", 2)) / 1000
+MAX_BATCH = 256
+# Seconds a city's latest readings are trusted before MongoDB is asked again
+POLL_SECONDS = int(os.getenv("AQI_SERVICE_POLL_SECONDS", 60))
+MODEL_REFRESH_SECONDS = int(os.getenv("AQI_SERVICE_MODEL_REFRESH_SECONDS", 300))
+# Retry delay while the first model cannot be loaded
+MODEL_RETRY_SECONDS = 10
+CACHE_ENTRIES = 4096
+LATENCY_SAMPLES = 10000
+
+class ForecastModel:
+    """
+    One registered version: the numpy runtime when one was exported,
+    otherwise the sklearn model, plus its conformal calibration if any
+    """
+
+    def __init__(self, version, model=None, runtime=None, calibration=None):
+        self.version = str(version)
+        self.model = model
+        self.runtime = runtime
+        self.calibration = calibration
+
+    @classmethod
+    def load(cls, version):
+        runtime = model_cache.load_runtime(model_cache.MODEL_NAME, version)
+        model = None if runtime is not None else model_cache.load_model(model_cache.MODEL_NAME, version)
+        calibration = model_cache.load_calibration(model_cache.MODEL_NAME, version)
+        return cls(version, model, runtime, calibration)
+
+    def predict(self, X):
+        """
+        (prediction, lower, upper) rows for X; the bounds are None when
+        there is no usable calibration
+        """
+        if self.runtime is not None:
+            prediction = tree_runtime.predict(self.runtime, X)
+        else:
+            prediction = self.model.predict(X)
+
+        calibration = self.calibration
+        if calibration is None or (calibration["normalized"] and self.runtime is None):
+            return [(row, None, None) for row in prediction]
+        lower, _, upper = prediction_intervals.predict_intervals(calibration, X, self.runtime, self.model)
+        return list(zip(prediction, lower, upper))
+
+class MicroBatcher:
+    """
+    Collects feature rows submitted within `window` seconds (or up to
+    `max_batch` rows) and scores them with a single predict call
+    """
+
+    def __init__(self, predict, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.predict = predict
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = []
+        self.flush_handle = None
+        self.batches = 0
+        self.rows = 0
+
+    async def submit(self, row):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((row, future))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+
+        self.batches += 1
+        self.rows += len(batch)
+        # A tree-runtime batch takes well under a millisecond, so it runs on
+        # the event loop rather than paying for a thread hop
+        try:
+            results = self.predict(np.vstack([row for row, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+class LatencyStats:
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self.latencies = deque(maxlen=samples)
+        self.requests = 0
+        self.cache_hits = 0
+        self.errors = 0
+
+    def record(self, seconds):
+        self.requests += 1
+        self.latencies.append(seconds)
+
+    def snapshot(self):
+        latencies = np.array(self.latencies) * 1000
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0.0, 0.0)
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "errors": self.errors,
+            "latency_ms_p50": float(p50),
+            "latency_ms_p99": float(p99)
+        }
+
+class LRUCache:
+    def __init__(self, max_entries=CACHE_ENTRIES):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+def city_query(city):
+    if city == DEFAULT_CITY:
+        return KARACHI_COLLECTION, {}
+    return CITY_COLLECTION, {"city": city}
+
+def fetch_context(db, city, at=None):
+    """
+    Newest CONTEXT_ROWS readings for `city`, up to and including `at`
+    """
+    collection_name, query = city_query(city)
+    if at is not None:
+        query = {**query, "time": {"$lte": at}}
+    df = pd.DataFrame(latest_readings(db[collection_name], CONTEXT_ROWS, READING_PROJECTION, query))
+    if df.empty:
+        return df
+    df["time"] = pd.to_datetime(df["time"])
+    return df
+
+class ForecastService:
+
+    def __init__(self, db, model=None):
+        self.db = db
+        self.model = model
+        self.batcher = MicroBatcher(self._predict)
+        self.responses = LRUCache()
+        # city -> (fetched at, context); historical contexts are keyed (city, at)
+        self.contexts = {}
+        self.historical = LRUCache()
+        self.context_locks = {}
+        self.stats = LatencyStats()
+
+    def _predict(self, X):
+        return self.model.predict(X)
+
+    async def refresh_model(self):
+        version = await asyncio.to_thread(model_cache.get_latest_version)
+        if self.model is None or self.model.version != str(version):
+            self.model = await asyncio.to_thread(ForecastModel.load, version)
+            print(f"Serving model v{self.model.version}")
+
+    async def _model_refresher(self):
+        # Also loads the first model, so the service listens (and reports
+        # "loading" on /health) while the registry is slow or down
+        while True:
+            if self.model is not None:
+                await asyncio.sleep(MODEL_REFRESH_SECONDS)
+            try:
+                await self.refresh_model()
+            except Exception as e:
+                # Keep serving the loaded version while the registry is down
+                print(f"Model refresh failed: {e}")
+                if self.model is None:
+                    await asyncio.sleep(MODEL_RETRY_SECONDS)
+
+    async def latest_context(self, city):
+        cached = self.contexts.get(city)
+        if cached is not None and time.monotonic() - cached[0] < POLL_SECONDS:
+            return cached[1]
+
+        # One MongoDB round trip per city per poll, however many requests wait
+        lock = self.context_locks.setdefault(city, asyncio.Lock())
+        async with lock:
+            cached = self.contexts.get(city)
+            if cached is not None and time.monotonic() - cached[0] < POLL_SECONDS:
+                return cached[1]
+            context = await asyncio.to_thread(fetch_context, self.db, city)
+            self.contexts[city] = (time.monotonic(), context)
+            return context
+
+    async def historical_context(self, city, at):
+        key = (city, at)
+        context = self.historical.get(key)
+        if context is None:
+            context = await asyncio.to_thread(fetch_context, self.db, city, at)
+            self.historical.put(key, context)
+        return context
+
+    async def forecast(self, city, at=None):
+        """
+        Serialized JSON body of the forecast, or None when the city has no
+        usable readings
+        """
+        context = await (self.latest_context(city) if at is None else self.historical_context(city, at))
+        if context.empty:
+            return None
+
+        model = self.model
+        input_watermark = context["time"].iloc[-1]
+        key = (city, input_watermark, model.version)
+        body = self.responses.get(key)
+        if body is not None:
+            self.stats.cache_hits += 1
+            return body
+
+        latest = latest_feature_row(context)
+        if latest.empty:
+            return None
+        prediction, lower, upper = await self.batcher.submit(latest[FEATURES].to_numpy(dtype=np.float64)[0])
+
+        forecast_base = latest["time"].iloc[0]
+        predictions = []
+        for i, hours in enumerate(HORIZON_HOURS):
+            entry = {
+                "horizon": i + 1,
+                "time": (forecast_base + timedelta(hours=hours)).isoformat(),
+                "aqi": float(prediction[i])
+            }
+            if lower is not None:
+                entry["lower"], entry["upper"] = float(lower[i]), float(upper[i])
+            predictions.append(entry)
+
+        body = json.dumps({
+            "city": city,
+            "model_version": model.version,
+            "input_watermark": input_watermark.isoformat(),
+            "predictions": predictions
+        }).encode()
+        self.responses.put(key, body)
+        return body
+
+    async def handle_forecast(self, request):
+        started = time.perf_counter()
+        try:
+            city = request.query.get("city", DEFAULT_CITY)
+            at = request.query.get("at")
+            if at is not None:
+                try:
+                    at = normalize_hour(at)
+                except ValueError:
+                    self.stats.errors += 1
+                    return web.json_response({"error": f"Invalid timestamp: {at}"}, status=400)
+
+            if self.model is None:
+                return web.json_response({"error": "Model is loading"}, status=503)
+
+            body = await self.forecast(city, at)
+            if body is None:
+                self.stats.errors += 1
+                return web.json_response({"error": f"No readings for {city}"}, status=404)
+            return web.Response(body=body, content_type="application/json")
+        finally:
+            self.stats.record(time.perf_counter() - started)
+
+    async def handle_stats(self, request):
+        stats = self.stats.snapshot()
+        stats["model_version"] = self.model.version if self.model else None
+        stats["batches"] = self.batcher.batches
+        stats["mean_batch_size"] = self.batcher.rows / self.batcher.batches if self.batcher.batches else 0.0
+        return web.json_response(stats)
+
+    async def handle_health(self, request):
+        # Listening, but the refresher has not loaded the first model yet
+        if self.model is None:
+            return web.json_response({"status": "loading", "model_version": None})
+        return web.json_response({"status": "ok", "model_version": self.model.version})
+
+    async def on_startup(self, app):
+        app["model_refresher"] = asyncio.create_task(self._model_refresher())
+
+    async def on_cleanup(self, app):
+        app["model_refresher"].cancel()
+
+def create_app(db, model=None):
+    """
+    `model` is a ForecastModel; when omitted the latest registered version
+    is loaded in the background after startup (MLflow tracking must be
+    configured) and /forecast answers 503 until it is
+    """
+    service = ForecastService(db, model)
+    app = web.Application()
+    app["service"] = service
+    app.router.add_get("/forecast", service.handle_forecast)
+    app.router.add_get("/stats", service.handle_stats)
+    app.router.add_get("/health", service.handle_health)
+    app.on_startup.append(service.on_startup)
+    app.on_cleanup.append(service.on_cleanup)
+    return app
+
+
+def main():
+
+    from materialize_forecast import configure_tracking
+
+    parser = argparse.ArgumentParser(description="AQI forecast HTTP service")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8080)))
+    args = parser.parse_args()
+
+    configure_tracking()
+    db = get_database()
+    web.run_app(create_app(db), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
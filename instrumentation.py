@@ -0,0 +1,270 @@
+import contextvars
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Windows: no getrusage; peak RSS is reported as 0 there
+    resource = None
+
+# Stage-level tracing shared by the ETL, backfill, training and the
+# dashboard. span() times a stage (extract, transform, load, fit, predict,
+# render, ...) and records its peak RSS; count() adds to a counter (rows,
+# bytes, retries), labelled with the enclosing span. export() writes what
+# has been recorded to AQI_METRICS_PATH as Prometheus text (for the
+# node_exporter textfile collector) or as OTLP/JSON lines (traces, then
+# metrics) for an OpenTelemetry collector's otlpjsonfile receiver.
+#
+#   with instrumentation.span("load"):
+#       counts = upsert_readings(collection, records)
+#       instrumentation.count("rows", len(records))
+
+METRICS_PATH = os.getenv("AQI_METRICS_PATH")
+METRICS_FORMAT = os.getenv("AQI_METRICS_FORMAT", "prometheus")
+SERVICE_NAME = os.getenv("AQI_SERVICE_NAME") or os.path.splitext(os.path.basename(sys.argv[0]))[0] or "aqi"
+
+# Finished spans kept for OTLP export; long-lived processes (the dashboard)
+# only keep the newest ones
+MAX_SPANS = 10000
+
+_lock = threading.Lock()
+_spans = deque(maxlen=MAX_SPANS)
+# stage name -> {"count", "seconds", "last_seconds", "peak_rss_bytes"}
+_stages = {}
+# (counter name, sorted label items) -> value
+_counters = {}
+_started_ns = time.time_ns()
+_current = contextvars.ContextVar("aqi_span", default=None)
+
+class Span:
+
+    def __init__(self, name, attributes, parent):
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.peak_rss = 0
+
+def _peak_rss():
+    """
+    Peak resident set size in bytes: since the last reset on Linux,
+    otherwise since process start
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _reset_peak_rss():
+    # Only the main thread resets the peak, so concurrent worker spans
+    # (backfill chunks) never wipe each other's high-water mark
+    if threading.current_thread() is not threading.main_thread():
+        return
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+@contextmanager
+def span(name, **attributes):
+    parent = _current.get()
+    if parent is not None:
+        # Keep the parent's peak so far; the child is about to reset it
+        parent.peak_rss = max(parent.peak_rss, _peak_rss())
+    _reset_peak_rss()
+
+    current = Span(name, attributes, parent)
+    token = _current.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except Exception as e:
+        current.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        _current.reset(token)
+        current.end_ns = time.time_ns()
+        current.peak_rss = max(current.peak_rss, _peak_rss())
+        if parent is not None:
+            parent.peak_rss = max(parent.peak_rss, current.peak_rss)
+        _finish(current, seconds)
+
+def _finish(current, seconds):
+    with _lock:
+        _spans.append(current)
+        stage = _stages.setdefault(current.name, {"count": 0, "seconds": 0.0, "last_seconds": 0.0, "peak_rss_bytes": 0})
+        stage["count"] += 1
+        stage["seconds"] += seconds
+        stage["last_seconds"] = seconds
+        stage["peak_rss_bytes"] = max(stage["peak_rss_bytes"], current.peak_rss)
+
+def count(name, value=1, **labels):
+    """
+    Add `value` to counter `name`; the enclosing span is the `stage` label
+    unless one is given
+    """
+    current = _current.get()
+    if "stage" not in labels and current is not None:
+        labels["stage"] = current.name
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def stage_metrics():
+    """
+    Flat {metric: value} of every stage and counter so far, for
+    mlflow.log_metrics
+    """
+    with _lock:
+        metrics = {}
+        for name, stage in _stages.items():
+            metrics[f"stage_{name}_seconds"] = stage["seconds"]
+            metrics[f"stage_{name}_peak_rss_mb"] = stage["peak_rss_bytes"] / 1024 ** 2
+        for (name, labels), value in _counters.items():
+            suffix = "_".join(str(v) for _, v in labels)
+            metrics[f"{name}_{suffix}" if suffix else name] = value
+        return metrics
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+def prometheus_text(service=SERVICE_NAME):
+    with _lock:
+        stages = {name: dict(stage) for name, stage in _stages.items()}
+        counters = dict(_counters)
+
+    lines = [
+        "# HELP aqi_stage_duration_seconds Wall-clock time spent in each stage",
+        "# TYPE aqi_stage_duration_seconds summary"
+    ]
+    for name, stage in sorted(stages.items()):
+        labels = _labels(service=service, stage=name)
+        lines.append(f"aqi_stage_duration_seconds_sum{labels} {stage['seconds']:.6f}")
+        lines.append(f"aqi_stage_duration_seconds_count{labels} {stage['count']}")
+
+    lines += ["# HELP aqi_stage_last_duration_seconds Duration of the latest run of each stage",
+              "# TYPE aqi_stage_last_duration_seconds gauge"]
+    for name, stage in sorted(stages.items()):
+        lines.append(f"aqi_stage_last_duration_seconds{_labels(service=service, stage=name)} {stage['last_seconds']:.6f}")
+
+    lines += ["# HELP aqi_stage_peak_rss_bytes Peak resident set size during each stage",
+              "# TYPE aqi_stage_peak_rss_bytes gauge"]
+    for name, stage in sorted(stages.items()):
+        lines.append(f"aqi_stage_peak_rss_bytes{_labels(service=service, stage=name)} {stage['peak_rss_bytes']}")
+
+    for counter in sorted({name for name, _ in counters}):
+        lines += [f"# TYPE aqi_{counter}_total counter"]
+        for (name, labels), value in sorted(counters.items()):
+            if name == counter:
+                lines.append(f"aqi_{counter}_total{_labels(service=service, **dict(labels))} {value}")
+
+    return "\n".join(lines) + "\n"
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def _otlp_attributes(attributes):
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()]
+
+def otlp_json(service=SERVICE_NAME):
+    """
+    Two OTLP/JSON export requests: traces, then metrics
+    """
+    with _lock:
+        spans = list(_spans)
+        stages = {name: dict(stage) for name, stage in _stages.items()}
+        counters = dict(_counters)
+
+    resource_attributes = _otlp_attributes({"service.name": service})
+    scope = {"name": "aqi.instrumentation"}
+    now = str(time.time_ns())
+
+    traces = {"resourceSpans": [{
+        "resource": {"attributes": resource_attributes},
+        "scopeSpans": [{"scope": scope, "spans": [
+            {
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                **({"parentSpanId": s.parent.span_id} if s.parent else {}),
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": _otlp_attributes({**s.attributes, "process.peak_rss_bytes": s.peak_rss})
+            }
+            for s in spans
+        ]}]
+    }]}
+
+    def point(value, **attributes):
+        return {
+            "attributes": _otlp_attributes(attributes),
+            "startTimeUnixNano": str(_started_ns),
+            "timeUnixNano": now,
+            "asDouble": float(value)
+        }
+
+    def cumulative_sum(name, unit, points):
+        return {"name": name, "unit": unit, "sum": {
+            "aggregationTemporality": 2, "isMonotonic": True, "dataPoints": points
+        }}
+
+    metrics = [
+        cumulative_sum("aqi.stage.duration", "s", [point(s["seconds"], stage=n) for n, s in stages.items()]),
+        {"name": "aqi.stage.peak_rss", "unit": "By", "gauge": {
+            "dataPoints": [point(s["peak_rss_bytes"], stage=n) for n, s in stages.items()]
+        }}
+    ]
+    for counter in sorted({name for name, _ in counters}):
+        metrics.append(cumulative_sum(f"aqi.{counter}", "1", [
+            point(value, **dict(labels)) for (name, labels), value in counters.items() if name == counter
+        ]))
+
+    metrics_request = {"resourceMetrics": [{
+        "resource": {"attributes": resource_attributes},
+        "scopeMetrics": [{"scope": scope, "metrics": metrics}]
+    }]}
+    return json.dumps(traces) + "\n" + json.dumps(metrics_request) + "\n"
+
+def export(path=METRICS_PATH, fmt=METRICS_FORMAT, service=SERVICE_NAME):
+    """
+    Write everything recorded so far to `path`; a no-op when no path is
+    configured. The file is replaced atomically, so a scraper never sees a
+    partial write.
+    """
+    if not path:
+        return
+    text = otlp_json(service) if fmt == "otlp" else prometheus_text(service)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -0,0 +1,104 @@
+import os
+import mlflow
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from pymongo import DESCENDING
+import data_access
+import model_cache
+import prediction_intervals
+from model_cache import MODEL_NAME
+from feature_engine import FEATURES, HORIZON_HOURS, LATEST_LOOKBACK_ROWS, latest_feature_row
+
+# Newest readings fetched per run; enough for latest_feature_row()
+CONTEXT_ROWS = LATEST_LOOKBACK_ROWS + 1
+
+def configure_tracking():
+    dagshub_token = os.getenv("DAGSHUB_REPO_TOKEN")
+
+    if not dagshub_token:
+        raise ValueError("DAGSHUB_REPO_TOKEN environment variable is not set")
+
+    mlflow.set_tracking_uri("https://dagshub.com/hasnainhissam56/AQI_Predictor_Models.mlflow")
+    os.environ["MLFLOW_TRACKING_USERNAME"] = dagshub_token
+    os.environ["MLFLOW_TRACKING_PASSWORD"] = dagshub_token
+
+def load_registered_model():
+    configure_tracking()
+    return model_cache.load_latest_model(MODEL_NAME)
+
+def load_recent_readings(collection, rows=CONTEXT_ROWS):
+    df = pd.DataFrame(data_access.latest_readings(collection, rows, {"_id": 0}))
+    if df.empty:
+        return df
+    df["time"] = pd.to_datetime(df["time"])
+    return df
+
+def compute_forecast(model, df, calibration=None, runtime=None):
+    latest = latest_feature_row(df)
+    X = latest[FEATURES].values
+    prediction = model.predict(X)[0]
+
+    intervals = None
+    if calibration and (runtime is not None or not calibration["normalized"]):
+        lower, median, upper = prediction_intervals.predict_intervals(calibration, X, runtime, model)
+        intervals = lower[0], median[0], upper[0]
+
+    # The watermark is the newest reading seen, even if it was incomplete
+    input_watermark = df["time"].max()
+    forecast_base = latest["time"].iloc[0]
+
+    predictions = [
+        {
+            "horizon": i + 1,
+            "time": (forecast_base + timedelta(hours=hours)).to_pydatetime(),
+            "aqi": float(value)
+        }
+        for i, (hours, value) in enumerate(zip(HORIZON_HOURS, prediction))
+    ]
+    if intervals is not None:
+        for i, entry in enumerate(predictions):
+            entry["lower"], entry["median"], entry["upper"] = (float(b[i]) for b in intervals)
+
+    return input_watermark.to_pydatetime(), predictions
+
+def write_forecast(db, model_version, input_watermark, predictions):
+    """
+    Upsert one forecast document per (model version, input watermark),
+    so reruns for the same reading do not pile up duplicates.
+    """
+    forecasts = db["forecasts"]
+    forecasts.create_index([("input_watermark", DESCENDING)])
+
+    key = {"model_version": str(model_version), "input_watermark": input_watermark}
+    forecasts.update_one(
+        key,
+        {"$set": {
+            **key,
+            "model_name": MODEL_NAME,
+            "predictions": predictions,
+            "created_at": datetime.now(timezone.utc)
+        }},
+        upsert=True
+    )
+
+
+def main():
+
+    db = data_access.get_database()
+
+    df = load_recent_readings(db["karachi_aqi_etl"])
+    if len(df) < 2:
+        print("Not enough readings to build a forecast")
+        return
+
+    model, model_version = load_registered_model()
+    calibration = model_cache.load_calibration(MODEL_NAME, model_version)
+    runtime = model_cache.load_runtime(MODEL_NAME, model_version) if calibration else None
+    input_watermark, predictions = compute_forecast(model, df, calibration, runtime)
+    write_forecast(db, model_version, input_watermark, predictions)
+
+    print(f"Forecast for {input_watermark} written with model v{model_version}")
+
+
+if __name__ == "__main__":
+    main()
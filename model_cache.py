@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+
+MODEL_NAME = "AQI_Predictor_Model"
+
+# Downloaded model artifacts live under <cache dir>/<model name>/<version>
+MODEL_CACHE_DIR = os.getenv("AQI_MODEL_CACHE_DIR", ".model_cache")
+
+def get_latest_version(model_name=MODEL_NAME):
+    """
+    Cheap registry metadata call; nothing is downloaded
+    """
+    from mlflow.tracking import MlflowClient
+
+    latest_versions = MlflowClient().get_latest_versions(model_name, stages=["None"])
+    return str(latest_versions[0].version)
+
+def cached_model_path(model_name, version, cache_dir=MODEL_CACHE_DIR):
+    return os.path.join(cache_dir, model_name, str(version))
+
+def cached_versions(model_name=MODEL_NAME, cache_dir=MODEL_CACHE_DIR):
+    model_dir = os.path.join(cache_dir, model_name)
+    if not os.path.isdir(model_dir):
+        return []
+    versions = [v for v in os.listdir(model_dir) if v.isdigit()]
+    return sorted(versions, key=int)
+
+def download_model(model_name, version, cache_dir=MODEL_CACHE_DIR):
+    import mlflow
+
+    path = cached_model_path(model_name, version, cache_dir)
+    if os.path.isdir(path):
+        return path
+
+    # Download next to the final location and rename, so a crash mid-way
+    # never leaves a half-written version behind
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    staging_dir = tempfile.mkdtemp(dir=os.path.dirname(path))
+    try:
+        local_path = mlflow.artifacts.download_artifacts(
+            artifact_uri=f"models:/{model_name}/{version}",
+            dst_path=staging_dir
+        )
+        os.replace(local_path, path)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    return path
+
+def load_model(model_name, version, cache_dir=MODEL_CACHE_DIR):
+    import mlflow.sklearn
+
+    return mlflow.sklearn.load_model(download_model(model_name, version, cache_dir))
+
+def load_latest_model(model_name=MODEL_NAME, cache_dir=MODEL_CACHE_DIR):
+    """
+    Load the latest registered version, downloading it only if it is not
+    cached yet. Falls back to the newest cached version when the registry
+    cannot be reached.
+    """
+    try:
+        version = get_latest_version(model_name)
+    except Exception:
+        versions = cached_versions(model_name, cache_dir)
+        if not versions:
+            raise
+        version = versions[-1]
+
+    return load_model(model_name, version, cache_dir), version
+
+def _download_run_artifact(model_name, version, artifact_path, cache_dir):
+    """
+    Local copy of one file logged with the version's run, cached under
+    <version>-runtime/, or None when the run has no such artifact
+    """
+    runtime_dir = cached_model_path(model_name, version, cache_dir) + "-runtime"
+    path = os.path.join(runtime_dir, os.path.basename(artifact_path))
+
+    if not os.path.exists(path):
+        import mlflow
+        from mlflow.tracking import MlflowClient
+
+        run_id = MlflowClient().get_model_version(model_name, version).run_id
+        os.makedirs(runtime_dir, exist_ok=True)
+        staging_dir = tempfile.mkdtemp(dir=runtime_dir)
+        try:
+            local_path = mlflow.artifacts.download_artifacts(
+                run_id=run_id,
+                artifact_path=artifact_path,
+                dst_path=staging_dir
+            )
+            os.replace(local_path, path)
+        except Exception:
+            return None
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    return path
+
+def load_runtime(model_name, version, cache_dir=MODEL_CACHE_DIR):
+    """
+    Numpy-only tree runtime logged with this version (see tree_runtime.py),
+    or None when the version has no export (e.g. SVR models)
+    """
+    import tree_runtime
+
+    path = _download_run_artifact(
+        model_name, version,
+        f"{tree_runtime.RUNTIME_ARTIFACT_PATH}/{tree_runtime.RUNTIME_FILE}",
+        cache_dir
+    )
+    return tree_runtime.load_runtime(path) if path else None
+
+def load_calibration(model_name, version, cache_dir=MODEL_CACHE_DIR):
+    """
+    Conformal calibration logged with this version (see
+    prediction_intervals.py), or None for versions trained before it existed
+    """
+    import json
+    import prediction_intervals
+
+    path = _download_run_artifact(
+        model_name, version,
+        f"{prediction_intervals.CALIBRATION_ARTIFACT_PATH}/{prediction_intervals.CALIBRATION_FILE}",
+        cache_dir
+    )
+    if not path:
+        return None
+    with open(path) as f:
+        return json.load(f)
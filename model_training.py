@@ -1,52 +1,105 @@
 import os
+import tempfile
 import mlflow
+from mlflow.tracking import MlflowClient
 import dagshub
+import bson
+import numpy as np
 import pandas as pd
-from pymongo import MongoClient
-from sklearn.model_selection import GridSearchCV
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, TimeSeriesSplit
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.svm import SVR
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from sklearn.multioutput import MultiOutputRegressor
 import xgboost as xgb
-
-def data_extraction(mongo_uri):
-    client = MongoClient(mongo_uri)
-    db = client["aqi_data"]
-    collection = db["karachi_aqi_etl"]
-    df = pd.DataFrame(list(collection.find()))
+import bucket_store
+import data_access
+import feature_store
+import instrumentation
+import model_cache
+import prediction_intervals
+import training_scheduler
+import tree_runtime
+from feature_engine import FEATURES, TARGETS, HORIZON_HOURS, build_training_frame
+
+# Only the columns the model pipeline reads
+MODEL_COLUMNS = data_access.READING_FIELDS
+VALUE_COLUMNS = MODEL_COLUMNS[1:]
+
+EXTRACTION_BATCH_SIZE = 10000
+
+def _flush_batch(batch, columns, value_dtype):
+    columns["time"].append(np.array(batch["time"], dtype="datetime64[ns]"))
+    for name in VALUE_COLUMNS:
+        columns[name].append(np.array(batch[name], dtype=value_dtype))
+        batch[name].clear()
+    batch["time"].clear()
+
+def data_extraction(mongo_uri, batch_size=EXTRACTION_BATCH_SIZE, downcast=False):
+    """
+    Stream the collection in large cursor batches and build one typed numpy
+    column per field, so only a single batch of documents is ever held as
+    Python objects. Raw BSON documents are decoded field by field.
+    """
+    db = data_access.get_database(mongo_uri)
+    collection = db[data_access.READINGS_COLLECTION]
+
+    if bucket_store.is_bucketed():
+        # One document per day; arrays become numpy columns directly
+        df = bucket_store.read_range(collection, db[bucket_store.BUCKET_COLLECTION], columns=VALUE_COLUMNS)
+        if downcast:
+            df[VALUE_COLUMNS] = df[VALUE_COLUMNS].astype(np.float32)
+        instrumentation.count("rows", len(df))
+        print(f"Extracted {len(df)} rows from day buckets, "
+              f"{df.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory")
+        return df
+
+    try:
+        collection = collection.with_options(
+            codec_options=CodecOptions(document_class=RawBSONDocument)
+        )
+    except NotImplementedError:
+        # mongomock has no raw BSON support; plain dicts work the same way
+        pass
+
+    value_dtype = np.float32 if downcast else np.float64
+    projection = data_access.READING_PROJECTION
+
+    batch = {name: [] for name in MODEL_COLUMNS}
+    columns = {name: [] for name in MODEL_COLUMNS}
+    rows = 0
+    bytes_read = 0
+
+    for doc in collection.find({}, projection, batch_size=batch_size):
+        raw = getattr(doc, "raw", None)
+        bytes_read += len(raw) if raw is not None else len(bson.encode(doc))
+        for name in MODEL_COLUMNS:
+            value = doc.get(name)
+            batch[name].append(np.nan if value is None and name != "time" else value)
+        rows += 1
+        if len(batch["time"]) >= batch_size:
+            _flush_batch(batch, columns, value_dtype)
+
+    _flush_batch(batch, columns, value_dtype)
+
+    df = pd.DataFrame({name: np.concatenate(chunks) for name, chunks in columns.items()})
+    instrumentation.count("rows", rows)
+    instrumentation.count("bytes", bytes_read)
+    print(f"Extracted {rows} rows, {bytes_read / 1e6:.1f} MB read, "
+          f"{df.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory")
     return df
 
 def data_preprocessing(df):
-
-    df["time"] = pd.to_datetime(df["time"])
-    df = df.sort_values("time")
-
-    df["hour"] = df["time"].dt.hour
-    df["day"] = df["time"].dt.day
-    df["dayofweek"] = df["time"].dt.dayofweek
-    df["month"] = df["time"].dt.month
-
-    df["aqi_change_rate"] = df["aqi"].diff()
-
-    # Multi-step forecasting
-    df["aqi_t+1"] = df["aqi"].shift(-24)
-    df["aqi_t+2"] = df["aqi"].shift(-48)
-    df["aqi_t+3"] = df["aqi"].shift(-72)
-
-    df.dropna(inplace=True)
-
-    return df
+    return build_training_frame(df)
 
 def data_splitting(df):
 
-    features = [
-        "co", "no2", "o3", "pm10", "pm2_5", "so2",
-        "hour", "day", "dayofweek", "month", "aqi_change_rate"
-    ]
-
-    X = df[features]
-    y = df[["aqi_t+1", "aqi_t+2", "aqi_t+3"]]
+    X = df[FEATURES]
+    y = df[TARGETS]
 
     split = int(0.8 * len(df))
 
@@ -55,52 +108,196 @@ def data_splitting(df):
         y[:split], y[split:]
     )
 
-def train_random_forest(X_train, y_train):
-    model = MultiOutputRegressor(
+# Share of the held-out rows kept back for conformal calibration. Model
+# selection scores the older part; the interval is calibrated only on the
+# newest part, which no choice was made on.
+CALIBRATION_FRACTION = float(os.getenv("AQI_CALIBRATION_FRACTION", 0.5))
+
+def calibration_splitting(X_test, y_test):
+
+    split = int((1 - CALIBRATION_FRACTION) * len(X_test))
+
+    return (
+        X_test[:split], X_test[split:],
+        y_test[:split], y_test[split:]
+    )
+
+def random_forest_model():
+    return MultiOutputRegressor(
         RandomForestRegressor(random_state=42)
     )
 
-    param_grid = {
-        "estimator__n_estimators": [100, 200],
-        "estimator__max_depth": [None, 10, 20]
-    }
+RANDOM_FOREST_PARAM_GRID = {
+    "estimator__n_estimators": [100, 200],
+    "estimator__max_depth": [None, 10, 20]
+}
+
+def xgboost_model():
+    return MultiOutputRegressor(
+        xgb.XGBRegressor(random_state=42)
+    )
+
+XGBOOST_PARAM_GRID = {
+    "estimator__n_estimators": [100, 200],
+    "estimator__learning_rate": [0.05, 0.1],
+    "estimator__max_depth": [4, 6]
+}
 
-    grid = GridSearchCV(model, param_grid, cv=3, n_jobs=-1)
+def svr_model():
+    return MultiOutputRegressor(SVR())
+
+SVR_PARAM_GRID = {
+    "estimator__kernel": ["rbf", "linear"],
+    "estimator__C": [0.1, 1]
+}
+
+# name -> (model builder, param grid), in training order
+MODEL_FAMILIES = {
+    "XGBoost": (xgboost_model, XGBOOST_PARAM_GRID),
+    "RandomForest": (random_forest_model, RANDOM_FOREST_PARAM_GRID),
+    "SVR": (svr_model, SVR_PARAM_GRID)
+}
+
+def train_random_forest(X_train, y_train):
+    param_grid = RANDOM_FOREST_PARAM_GRID
+
+    grid = GridSearchCV(random_forest_model(), param_grid, cv=3, n_jobs=-1)
     grid.fit(X_train, y_train)
 
     return grid.best_estimator_, param_grid
 
 
 def train_xgboost(X_train, y_train):
-    model = MultiOutputRegressor(
-        xgb.XGBRegressor(random_state=42)
-    )
+    param_grid = XGBOOST_PARAM_GRID
 
-    param_grid = {
-        "estimator__n_estimators": [100, 200],
-        "estimator__learning_rate": [0.05, 0.1],
-        "estimator__max_depth": [4, 6]
-    }
-
-    grid = GridSearchCV(model, param_grid, cv=3, n_jobs=-1)
+    grid = GridSearchCV(xgboost_model(), param_grid, cv=3, n_jobs=-1)
     grid.fit(X_train, y_train)
 
     return grid.best_estimator_, param_grid
 
 
 def train_svr(X_train, y_train):
-    model = MultiOutputRegressor(SVR())
-
-    param_grid = {
-        "estimator__kernel": ["rbf", "linear"],
-        "estimator__C": [0.1, 1]
-    }
+    param_grid = SVR_PARAM_GRID
 
-    grid = GridSearchCV(model, param_grid, cv=3, n_jobs=-1)
+    grid = GridSearchCV(svr_model(), param_grid, cv=3, n_jobs=-1)
     grid.fit(X_train, y_train)
 
     return grid.best_estimator_, param_grid
 
+# ================================
+# Successive-halving search
+# ================================
+
+# Forward-chaining folds; the gap keeps training targets (up to 72h ahead)
+# from overlapping the validation rows
+TIME_SERIES_FOLDS = 3
+TIME_SERIES_GAP = max(HORIZON_HOURS)
+
+HALVING_FACTOR = 3
+
+XGBOOST_SEARCH_SPACE = {
+    "estimator__learning_rate": [0.03, 0.05, 0.1, 0.2],
+    "estimator__max_depth": [3, 4, 6, 8],
+    "estimator__subsample": [0.7, 1.0],
+    "estimator__min_child_weight": [1, 5]
+}
+# Trees per XGBoost fit during the search; the final count comes from
+# early stopping on the newest slice of the training data
+XGBOOST_SEARCH_ESTIMATORS = 200
+XGBOOST_MAX_ESTIMATORS = 2000
+EARLY_STOPPING_ROUNDS = 50
+EARLY_STOPPING_FRACTION = 0.2
+
+RANDOM_FOREST_SEARCH_SPACE = {
+    "estimator__max_depth": [None, 10, 20, 30],
+    "estimator__min_samples_leaf": [1, 5, 10],
+    "estimator__max_features": [1.0, 0.5, "sqrt"]
+}
+RANDOM_FOREST_MAX_ESTIMATORS = 405
+
+SVR_SEARCH_SPACE = {
+    "estimator__kernel": ["rbf", "linear"],
+    "estimator__C": [0.1, 1, 10],
+    "estimator__epsilon": [0.1, 1.0]
+}
+
+def time_series_cv():
+    return TimeSeriesSplit(n_splits=TIME_SERIES_FOLDS, gap=TIME_SERIES_GAP)
+
+def halving_search(model, param_grid, X_train, y_train, **kwargs):
+    search = HalvingGridSearchCV(
+        model, param_grid,
+        cv=time_series_cv(),
+        factor=HALVING_FACTOR,
+        n_jobs=-1,
+        random_state=42,
+        **kwargs
+    )
+    search.fit(X_train, y_train)
+    return search
+
+def xgboost_early_stopping_estimators(params, X_train, y_train):
+    """
+    Boost each horizon on the older rows, stop on the newest time slice and
+    return the largest best iteration count across horizons.
+    """
+    X, y = np.asarray(X_train), np.asarray(y_train)
+    split = int((1 - EARLY_STOPPING_FRACTION) * len(X))
+    eval_start = split + TIME_SERIES_GAP
+
+    n_estimators = []
+    for i in range(y.shape[1]):
+        booster = xgb.XGBRegressor(
+            random_state=42,
+            n_estimators=XGBOOST_MAX_ESTIMATORS,
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+            **params
+        )
+        booster.fit(
+            X[:split], y[:split, i],
+            eval_set=[(X[eval_start:], y[eval_start:, i])],
+            verbose=False
+        )
+        n_estimators.append(booster.best_iteration + 1)
+
+    return max(n_estimators)
+
+def search_xgboost(X_train, y_train):
+    model = xgboost_model().set_params(estimator__n_estimators=XGBOOST_SEARCH_ESTIMATORS)
+    search = halving_search(model, XGBOOST_SEARCH_SPACE, X_train, y_train)
+
+    params = {k.removeprefix("estimator__"): v for k, v in search.best_params_.items()}
+    n_estimators = xgboost_early_stopping_estimators(params, X_train, y_train)
+
+    model = xgboost_model().set_params(**search.best_params_, estimator__n_estimators=n_estimators)
+    model.fit(X_train, y_train)
+
+    return model, XGBOOST_SEARCH_SPACE
+
+def search_random_forest(X_train, y_train):
+    # Halving on trees: weak configurations are dropped after small forests
+    search = halving_search(
+        random_forest_model(), RANDOM_FOREST_SEARCH_SPACE, X_train, y_train,
+        resource="estimator__n_estimators",
+        min_resources=RANDOM_FOREST_MAX_ESTIMATORS // HALVING_FACTOR ** 3,
+        max_resources=RANDOM_FOREST_MAX_ESTIMATORS
+    )
+    return search.best_estimator_, RANDOM_FOREST_SEARCH_SPACE
+
+def search_svr(X_train, y_train):
+    # Halving on rows
+    search = halving_search(svr_model(), SVR_SEARCH_SPACE, X_train, y_train)
+    return search.best_estimator_, SVR_SEARCH_SPACE
+
+def train_all_families(X_train, y_train):
+    """
+    Every (family, param combo, fold) fit in one shared process pool
+    """
+    return training_scheduler.train_families(
+        {name: (builder(), grid) for name, (builder, grid) in MODEL_FAMILIES.items()},
+        X_train, y_train
+    )
+
 def evaluate_model(model, X_test, y_test):
 
     y_pred = model.predict(X_test)
@@ -111,12 +308,7 @@ def evaluate_model(model, X_test, y_test):
 
     return mse, mae, r2
 
-def register_model(model, mse, mae, r2, param_grid):
-
-    """
-    Register model to DagsHub MLflow using token authentication
-    """
-    
+def configure_mlflow():
     # Get the DagsHub token from environment
     dagshub_token = os.getenv("DAGSHUB_REPO_TOKEN")
     
@@ -131,12 +323,37 @@ def register_model(model, mse, mae, r2, param_grid):
     os.environ["MLFLOW_TRACKING_USERNAME"] = dagshub_token
     os.environ["MLFLOW_TRACKING_PASSWORD"] = dagshub_token
 
+def log_tree_runtime(model):
+    """
+    Log the numpy-only runtime export next to the model, for tree families
+    """
+    try:
+        runtime = tree_runtime.export_model(model)
+    except TypeError:
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, tree_runtime.RUNTIME_FILE)
+        tree_runtime.save_runtime(runtime, path)
+        mlflow.log_artifact(path, artifact_path=tree_runtime.RUNTIME_ARTIFACT_PATH)
+
+def register_model(model, mse, mae, r2, param_grid, tags=None, calibration=None):
+
+    """
+    Register model to DagsHub MLflow using token authentication
+    """
+    
+    configure_mlflow()
+
     with mlflow.start_run() as run:
 
         mlflow.sklearn.log_model(
             model,
             artifact_path="model",
-            registered_model_name="AQI_Predictor_Model"
+            registered_model_name="AQI_Predictor_Model",
+            # The MLflow 2.x default; MLflow 3 defaults to skops, which
+            # refuses to load tree ensembles without trusted types
+            serialization_format="cloudpickle"
         )
 
         mlflow.log_metrics({
@@ -147,33 +364,209 @@ def register_model(model, mse, mae, r2, param_grid):
 
         mlflow.log_params(param_grid)
 
+        log_tree_runtime(model)
+
+        # Per-stage timings, peak RSS and row / byte counts of this run
+        mlflow.log_metrics(instrumentation.stage_metrics())
+
+        if calibration:
+            mlflow.log_dict(
+                calibration,
+                f"{prediction_intervals.CALIBRATION_ARTIFACT_PATH}/{prediction_intervals.CALIBRATION_FILE}"
+            )
+
+        if tags:
+            mlflow.set_tags(tags)
+
         print("Model Registered Successfully")
         return run.info.run_id
 
 
+# ================================
+# Incremental warm-start retraining
+# ================================
+
+# Full refit at least this often, whatever the drift
+FULL_REFIT_DAYS = int(os.getenv("AQI_FULL_REFIT_DAYS", 7))
+# Largest allowed R2 drop on the new rows before forcing a full refit
+DRIFT_THRESHOLD = float(os.getenv("AQI_DRIFT_THRESHOLD", 0.1))
+
+INCREMENTAL_XGBOOST_ROUNDS = 50
+INCREMENTAL_FOREST_TREES = 20
+MIN_INCREMENTAL_ROWS = 24
+
+def load_previous_model():
+    configure_mlflow()
+    model, version = model_cache.load_latest_model(model_cache.MODEL_NAME)
+
+    client = MlflowClient()
+    run_id = client.get_model_version(model_cache.MODEL_NAME, version).run_id
+    return model, version, client.get_run(run_id)
+
+def warm_start_update(model, X_new, y_new):
+    """
+    Continue each per-horizon estimator on the new rows only: extra boosting
+    rounds for XGBoost, extra trees for RandomForest. Returns None for
+    families that cannot be updated in place (SVR).
+    """
+    y_new = np.asarray(y_new)
+
+    if isinstance(model.estimator, xgb.XGBRegressor):
+        estimators = []
+        for i, booster in enumerate(model.estimators_):
+            continued = clone(booster).set_params(n_estimators=INCREMENTAL_XGBOOST_ROUNDS)
+            continued.fit(X_new, y_new[:, i], xgb_model=booster.get_booster())
+            estimators.append(continued)
+        model.estimators_ = estimators
+        return model
+
+    if isinstance(model.estimator, RandomForestRegressor):
+        for i, forest in enumerate(model.estimators_):
+            forest.set_params(
+                warm_start=True,
+                n_estimators=forest.n_estimators + INCREMENTAL_FOREST_TREES
+            )
+            forest.fit(X_new, y_new[:, i])
+        return model
+
+    return None
+
+# Tags every registered run carries; incremental updates need all of them
+REFIT_TAGS = ["train_watermark", "last_full_refit", "calibration_start", "calibration_end"]
+
+def full_refit_tags(df, X_cal):
+    """
+    The watermark is the newest row the full refit saw, held-out rows
+    included, so incremental runs only ever train on later rows and the
+    calibration window stays unseen by every update.
+    """
+    calibration_times = df.loc[X_cal.index, "time"]
+    return {
+        "train_watermark": df["time"].max().isoformat(),
+        "last_full_refit": pd.Timestamp.now().isoformat(),
+        "calibration_start": calibration_times.min().isoformat(),
+        "calibration_end": calibration_times.max().isoformat()
+    }
+
+def incremental_update(df):
+    """
+    Returns (model, mse, mae, r2, params, tags, calibration) for an in-place update,
+    "skip" when there is too little new data, or None when a full refit
+    is due (schedule, drift, missing metadata or unsupported family).
+    """
+    model, version, run = load_previous_model()
+    tags = run.data.tags
+
+    if any(tag not in tags for tag in REFIT_TAGS):
+        print("Registered model has no training metadata; full refit")
+        return None
+
+    last_full_refit = pd.Timestamp(tags["last_full_refit"])
+    if pd.Timestamp.now() - last_full_refit >= pd.Timedelta(days=FULL_REFIT_DAYS):
+        print(f"Last full refit was {last_full_refit}; full refit due")
+        return None
+
+    new_rows = df[df["time"] > pd.Timestamp(tags["train_watermark"])]
+    if len(new_rows) < MIN_INCREMENTAL_ROWS:
+        print(f"Only {len(new_rows)} new rows since the last run; nothing to update")
+        return "skip"
+
+    # The new rows are unseen by the registered model: score drift on them
+    X_new, y_new = new_rows[FEATURES], new_rows[TARGETS]
+    mse, mae, r2 = evaluate_model(model, X_new, y_new)
+    baseline_r2 = run.data.metrics.get("r2")
+    if baseline_r2 is not None and baseline_r2 - r2 > DRIFT_THRESHOLD:
+        print(f"R2 on new rows {r2:.4f} vs {baseline_r2:.4f} at registration; full refit")
+        return None
+
+    family = type(model.estimator).__name__
+    model = warm_start_update(model, X_new, y_new)
+    if model is None:
+        print(f"{family} cannot be warm started; full refit")
+        return None
+
+    params = {"refit": "incremental", "base_version": version, "new_rows": len(new_rows)}
+    tags = {
+        **{tag: tags[tag] for tag in REFIT_TAGS},
+        "train_watermark": new_rows["time"].max().isoformat()
+    }
+    # The updated model has new trees or rounds: recalibrate it on the last
+    # full refit's calibration rows, which no update has trained on
+    calibration_rows = df[
+        (df["time"] >= pd.Timestamp(tags["calibration_start"]))
+        & (df["time"] <= pd.Timestamp(tags["calibration_end"]))
+    ]
+    if calibration_rows.empty:
+        print("Calibration rows of the last full refit are gone; full refit")
+        return None
+    calibration = prediction_intervals.calibrate(
+        model, calibration_rows[FEATURES], calibration_rows[TARGETS]
+    )
+    return model, mse, mae, r2, params, tags, calibration
+
+
 # ================================
 # 7. MAIN PIPELINE
 # ================================
 
+# "parallel": one process pool across all families (training_scheduler)
+# "sequential": one GridSearchCV per family, as before
+# "halving": successive halving over larger spaces with time-series folds
+# "incremental": warm-start the registered model on new rows, falling back
+#                to a parallel full refit on schedule or on drift
+TRAINING_MODE = os.getenv("AQI_TRAINING_MODE", "parallel")
+
 def main():
 
     MONGO_URI = os.getenv("MONGO_URI")
+    FEATURE_STORE_DIR = os.getenv("AQI_FEATURE_STORE_DIR")
+
+    with instrumentation.span("extract"):
+        if FEATURE_STORE_DIR:
+            # Pull only new readings into the local mirror, then read it locally
+            feature_store.sync_from_uri(MONGO_URI, FEATURE_STORE_DIR)
+            df = feature_store.read_store(FEATURE_STORE_DIR)
+            instrumentation.count("rows", len(df))
+        else:
+            df = data_extraction(MONGO_URI)
+    with instrumentation.span("transform"):
+        df = data_preprocessing(df)
+
+    if TRAINING_MODE == "incremental":
+        with instrumentation.span("incremental_update"):
+            update = incremental_update(df)
+        if update == "skip":
+            return
+        if update is not None:
+            model, mse, mae, r2, params, tags, calibration = update
+            print(f"Incremental update → R2 on new rows before update: {r2}")
+            with instrumentation.span("register"):
+                register_model(model, mse, mae, r2, params, tags, calibration)
+            return
 
-    df = data_extraction(MONGO_URI)
-    df = data_preprocessing(df)
     X_train, X_test, y_train, y_test = data_splitting(df)
+    X_test, X_cal, y_test, y_cal = calibration_splitting(X_test, y_test)
+
+    if TRAINING_MODE in ("parallel", "incremental"):
+        with instrumentation.span("fit"):
+            trained = train_all_families(X_train, y_train)
+    else:
+        if TRAINING_MODE == "halving":
+            searches = {"XGBoost": search_xgboost, "RandomForest": search_random_forest, "SVR": search_svr}
+        else:
+            searches = {"XGBoost": train_xgboost, "RandomForest": train_random_forest, "SVR": train_svr}
+        trained = {}
+        for name, search in searches.items():
+            with instrumentation.span(f"fit.{name}"):
+                trained[name] = search(X_train, y_train)
 
     models = {}
 
-    # Train all models
-    for name, trainer in {
-        "XGBoost": train_xgboost,
-        "RandomForest": train_random_forest,
-        "SVR": train_svr
-    }.items():
+    # Evaluate all models
+    for name, (model, params) in trained.items():
 
-        model, params = trainer(X_train, y_train)
-        mse, mae, r2 = evaluate_model(model, X_test, y_test)
+        with instrumentation.span(f"evaluate.{name}"):
+            mse, mae, r2 = evaluate_model(model, X_test, y_test)
 
         models[name] = {
             "model": model,
@@ -192,14 +585,21 @@ def main():
     print(f"\nBest Model: {best_model_name}")
 
     # Register Best Model
-    register_model(
-        best["model"],
-        best["mse"],
-        best["mae"],
-        best["r2"],
-        best["params"]
-    )
+    with instrumentation.span("register"):
+        register_model(
+            best["model"],
+            best["mse"],
+            best["mae"],
+            best["r2"],
+            best["params"],
+            # Rows after the watermark are what the next incremental run trains on
+            tags=full_refit_tags(df, X_cal),
+            calibration=prediction_intervals.calibrate(best["model"], X_cal, y_cal)
+        )
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        instrumentation.export()
@@ -0,0 +1,136 @@
+import pandas as pd
+from pymongo import DESCENDING
+from feature_engine import ROLLING_WINDOWS, EWMA_SPAN
+
+# Streaming feature stage for the hourly ETL. A small state document keeps
+# a ring buffer of the last BUFFER_HOURS aqi readings plus running sums,
+# monotonic max windows and an EWMA, so each new reading updates every
+# rolling feature in constant time instead of rescanning the history.
+
+BUFFER_HOURS = max(ROLLING_WINDOWS)
+EWMA_ALPHA = 2 / (EWMA_SPAN + 1)
+
+POLLUTANTS = ["co", "no2", "o3", "pm10", "pm2_5", "so2"]
+
+STATE_COLLECTION = "feature_state"
+FEATURES_COLLECTION = "karachi_aqi_features"
+STATE_ID = "karachi_aqi_etl"
+
+def new_state():
+    return {
+        "buffer": [None] * BUFFER_HOURS,
+        "count": 0,
+        "last_time": None,
+        "sums": {str(w): 0.0 for w in ROLLING_WINDOWS},
+        # [index, value] pairs with decreasing values; the front is the max
+        "max_windows": {str(w): [] for w in ROLLING_WINDOWS},
+        "ewma": None
+    }
+
+def _lag(state, lag):
+    i = state["count"]
+    if i < lag:
+        return None
+    return state["buffer"][(i - lag) % BUFFER_HOURS]
+
+def update_state(state, reading):
+    """
+    Fold one reading into `state` and return its ready-to-predict feature
+    row. Readings at or before the last seen time are ignored, so reruns
+    of the same hour are harmless. Matches feature_engine.build_rolling_features
+    on a gap-free series.
+    """
+    time = pd.Timestamp(reading["time"])
+    if state["last_time"] is not None and time <= pd.Timestamp(state["last_time"]):
+        return None
+    if reading.get("aqi") is None:
+        return None
+
+    aqi = float(reading["aqi"])
+    i = state["count"]
+    buffer = state["buffer"]
+
+    lag_1 = _lag(state, 1)
+    lag_24 = _lag(state, 24)
+
+    row = {
+        "time": time.to_pydatetime(),
+        **{name: reading.get(name) for name in POLLUTANTS},
+        "aqi": aqi,
+        "hour": time.hour,
+        "day": time.day,
+        "dayofweek": time.dayofweek,
+        "month": time.month,
+        "aqi_change_rate": None if lag_1 is None else aqi - lag_1,
+        "aqi_lag_24": lag_24
+    }
+
+    for w in ROLLING_WINDOWS:
+        key = str(w)
+
+        # Running sum: add the new value, drop the one leaving the window
+        if i >= w:
+            state["sums"][key] -= buffer[(i - w) % BUFFER_HOURS]
+        state["sums"][key] += aqi
+
+        # Monotonic window: amortized O(1) rolling max
+        window = state["max_windows"][key]
+        while window and window[-1][1] <= aqi:
+            window.pop()
+        window.append([i, aqi])
+        while window[0][0] <= i - w:
+            window.pop(0)
+
+        full = i + 1 >= w
+        row[f"aqi_mean_{w}h"] = state["sums"][key] / w if full else None
+        row[f"aqi_max_{w}h"] = window[0][1] if full else None
+
+    ewma = aqi if state["ewma"] is None else EWMA_ALPHA * aqi + (1 - EWMA_ALPHA) * state["ewma"]
+    row[f"aqi_ewma_{EWMA_SPAN}h"] = ewma
+
+    buffer[i % BUFFER_HOURS] = aqi
+    state["ewma"] = ewma
+    state["count"] = i + 1
+    state["last_time"] = time.to_pydatetime()
+
+    return row
+
+def load_state(db):
+    doc = db[STATE_COLLECTION].find_one({"_id": STATE_ID})
+    if doc is None:
+        return None
+    doc.pop("_id")
+    return doc
+
+def save_state(db, state):
+    db[STATE_COLLECTION].replace_one({"_id": STATE_ID}, state, upsert=True)
+
+def bootstrap_state(collection, before):
+    # Warm a fresh state from the last BUFFER_HOURS readings before `before`.
+    # Windowed features are exact; the EWMA only sees these readings, which
+    # its 24-hour span forgets within a few days.
+    state = new_state()
+    cursor = (
+        collection.find({"time": {"$lt": before}}, {"_id": 0})
+        .sort("time", DESCENDING)
+        .limit(BUFFER_HOURS)
+    )
+    for reading in reversed(list(cursor)):
+        update_state(state, reading)
+    return state
+
+def update_streaming_features(db, reading):
+    """
+    ETL hook: update the persisted state with the reading just inserted
+    into karachi_aqi_etl and upsert its feature row.
+    """
+    state = load_state(db)
+    if state is None:
+        state = bootstrap_state(db["karachi_aqi_etl"], reading["time"])
+
+    row = update_state(state, reading)
+    if row is not None:
+        db[FEATURES_COLLECTION].update_one({"time": row["time"]}, {"$set": row}, upsert=True)
+        save_state(db, state)
+
+    return row
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+# Scripts live at the repository root and import each other by module name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import mongomock.collection as _mongomock_collection
+except ImportError:
+    _mongomock_collection = None
+
+if _mongomock_collection is not None:
+    # pymongo 4.9+ passes `sort` to bulk update/replace builders, which
+    # mongomock 4.x does not accept yet
+    def _drop_sort(add):
+        def wrapper(self, *args, sort=None, **kwargs):
+            return add(self, *args, **kwargs)
+        return wrapper
+
+    _builder = _mongomock_collection.BulkOperationBuilder
+    _builder.add_update = _drop_sort(_builder.add_update)
+    _builder.add_replace = _drop_sort(_builder.add_replace)
+
+@pytest.fixture
+def db():
+    mongomock = pytest.importorskip("mongomock")
+    return mongomock.MongoClient()["aqi_data"]
+
+# mongomock has no $dateTrunc: aggregation pipelines run against a real
+# mongod, skipped when none is reachable
+TEST_MONGO_URI = os.getenv("AQI_TEST_MONGO_URI", "mongodb://localhost:27017")
+
+@pytest.fixture
+def mongod_db():
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    client = MongoClient(TEST_MONGO_URI, serverSelectionTimeoutMS=500, tz_aware=False)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"no mongod at {TEST_MONGO_URI}")
+    client.drop_database("aqi_test")
+    yield client["aqi_test"]
+    client.drop_database("aqi_test")
+    client.close()
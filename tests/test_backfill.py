@@ -0,0 +1,123 @@
+import json
+import threading
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+flatbuffers = pytest.importorskip("flatbuffers")
+pytest.importorskip("openmeteo_requests")
+
+import backfill_data
+
+# WeatherApiResponse.hourly is field 11; VariablesWithTime holds time,
+# time_end, interval and variables (fields 0-3); VariableWithValues.values
+# is field 3
+HOURLY_SLOT = 11
+
+def encode_hourly(start, hours, columns):
+    """
+    One length-prefixed Open-Meteo FlatBuffers message with hourly
+    `columns` (one float list per requested variable)
+    """
+    builder = flatbuffers.Builder(1024)
+    variables = []
+    for values in columns:
+        builder.StartVector(4, len(values), 4)
+        for value in reversed(values):
+            builder.PrependFloat32(value)
+        vector = builder.EndVector()
+        builder.StartObject(4)
+        builder.PrependUOffsetTRelativeSlot(3, vector, 0)
+        variables.append(builder.EndObject())
+
+    builder.StartVector(4, len(variables), 4)
+    for variable in reversed(variables):
+        builder.PrependUOffsetTRelative(variable)
+    variable_vector = builder.EndVector()
+
+    start_ts = int(pd.Timestamp(start).timestamp())
+    builder.StartObject(4)
+    builder.PrependInt64Slot(0, start_ts, 0)
+    builder.PrependInt64Slot(1, start_ts + hours * 3600, 0)
+    builder.PrependInt32Slot(2, 3600, 0)
+    builder.PrependUOffsetTRelativeSlot(3, variable_vector, 0)
+    hourly = builder.EndObject()
+
+    builder.StartObject(HOURLY_SLOT + 1)
+    builder.PrependUOffsetTRelativeSlot(HOURLY_SLOT, hourly, 0)
+    builder.Finish(builder.EndObject())
+    message = bytes(builder.Output())
+    return len(message).to_bytes(4, "little") + message
+
+def stub_value(variable, time):
+    # Deterministic, so the test can recompute every stored value
+    return float(variable * 1000 + time.day * 24 + time.hour)
+
+class OpenMeteoStub(BaseHTTPRequestHandler):
+    requests = []
+    failing_dates = set()
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        start, end = date.fromisoformat(query["start_date"][0]), date.fromisoformat(query["end_date"][0])
+        type(self).requests.append((start, end))
+
+        if start in self.failing_dates:
+            body = json.dumps({"error": True, "reason": "stub failure"}).encode()
+            self.send_response(400)
+            self.send_header("Content-Type", "application/json")
+        else:
+            times = pd.date_range(start, end + pd.Timedelta(days=1), freq="h", inclusive="left")
+            columns = [[stub_value(i, t) for t in times] for i in range(len(query["hourly"]))]
+            body = encode_hourly(start, len(times), columns)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_url(tmp_path, monkeypatch):
+    # requests_cache writes its sqlite cache into the working directory
+    monkeypatch.chdir(tmp_path)
+    OpenMeteoStub.requests = []
+    OpenMeteoStub.failing_dates = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OpenMeteoStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v1/air-quality"
+    server.shutdown()
+
+def run(db, tmp_path, url):
+    return backfill_data.backfill(
+        db["karachi_aqi_etl"], date(2025, 1, 1), date(2025, 1, 10), chunk_days=3, workers=2,
+        checkpoint_path=str(tmp_path / "checkpoint.json"), url=url
+    )
+
+def test_backfill_loads_every_hour(db, tmp_path, stub_url):
+    assert run(db, tmp_path, stub_url) == []
+    assert sorted(OpenMeteoStub.requests) == backfill_data.split_range(date(2025, 1, 1), date(2025, 1, 10), 3)
+
+    collection = db["karachi_aqi_etl"]
+    assert collection.count_documents({}) == 10 * 24
+    doc = collection.find_one({"time": datetime(2025, 1, 5, 13)})
+    for i, field in enumerate(backfill_data.FIELDS):
+        assert doc[field] == stub_value(i, doc["time"])
+
+def test_backfill_resumes_only_failed_chunks(db, tmp_path, stub_url):
+    OpenMeteoStub.failing_dates = {date(2025, 1, 4)}
+    failed = run(db, tmp_path, stub_url)
+    assert failed == [(date(2025, 1, 4), date(2025, 1, 6))]
+    assert db["karachi_aqi_etl"].count_documents({}) == 7 * 24
+
+    OpenMeteoStub.failing_dates = set()
+    OpenMeteoStub.requests = []
+    assert run(db, tmp_path, stub_url) == []
+    assert OpenMeteoStub.requests == [(date(2025, 1, 4), date(2025, 1, 6))]
+    assert db["karachi_aqi_etl"].count_documents({}) == 10 * 24
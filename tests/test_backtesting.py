@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import BaseEstimator, RegressorMixin
+
+import backtesting
+from aqi_status import AQI_BANDS, get_aqi_status
+from feature_engine import FEATURES, HORIZON_HOURS, TARGETS
+
+class RowRecorder(BaseEstimator, RegressorMixin):
+    """
+    Remembers which rows (column 0 holds the row number) each fit saw
+    """
+
+    fits = []
+
+    def fit(self, X, y):
+        RowRecorder.fits.append(X[:, 0].astype(int).tolist())
+        self.mean_ = y.mean(axis=0)
+        return self
+
+    def predict(self, X):
+        return np.tile(self.mean_, (len(X), 1))
+
+def make_inputs(times):
+    n_rows = len(times)
+    X = np.column_stack([np.arange(n_rows), np.zeros((n_rows, 2))]).astype(np.float64)
+    y = np.arange(n_rows * 3, dtype=np.float64).reshape(n_rows, 3)
+    return X, y, np.asarray(times, dtype="datetime64[ns]")
+
+@pytest.fixture(autouse=True)
+def clear_fits():
+    RowRecorder.fits = []
+
+def test_training_rows_whose_targets_reach_the_block_are_left_out():
+    X, y, times = make_inputs(pd.date_range("2025-01-01", periods=300, freq="h"))
+    start, end = 200, 224
+
+    first, predicted = backtesting._run_block(RowRecorder(), X, y, times, start, end)
+    assert first == start and predicted.shape == (24, 3)
+    # Row t's furthest target is t + 72h, which must be known at row 200
+    assert RowRecorder.fits == [list(range(0, start - max(HORIZON_HOURS) + 1))]
+
+def test_gaps_in_the_series_are_measured_in_time_not_rows():
+    # A 48-hour outage right before the block
+    times = list(pd.date_range("2025-01-01", periods=100, freq="h"))
+    times += list(pd.date_range(times[-1] + pd.Timedelta(hours=49), periods=50, freq="h"))
+    X, y, times = make_inputs(times)
+
+    backtesting._run_block(RowRecorder(), X, y, times, 120, 130)
+    cutoff = times[120] - np.timedelta64(max(HORIZON_HOURS), "h")
+    assert RowRecorder.fits == [[i for i in range(120) if times[i] <= cutoff]]
+    # Row 120 is 69 hours after row 99; counting rows would have stopped at 48
+    assert RowRecorder.fits[0][-1] == 96
+
+def test_blocks_without_any_usable_training_row_are_skipped():
+    X, y, times = make_inputs(pd.date_range("2025-01-01", periods=100, freq="h"))
+    assert backtesting._run_block(RowRecorder(), X, y, times, 50, 60) is None
+
+def test_backtest_predicts_every_origin_once():
+    times = pd.date_range("2025-01-01", periods=400, freq="h")
+    df = pd.DataFrame(np.zeros((400, len(FEATURES))), columns=FEATURES)
+    df[FEATURES[0]] = np.arange(400)
+    for i, target in enumerate(TARGETS):
+        df[target] = np.linspace(10, 400, 400) + i
+    df.insert(0, "time", times)
+
+    predictions, metrics = backtesting.backtest(RowRecorder(), df, refit_every=50, min_train_rows=100, n_jobs=1)
+    # The first block (origins 100-149) has 29 usable training rows
+    assert len(predictions) == 300
+    assert predictions["time"].iloc[0] == times[100]
+    assert set(metrics["horizon"]) == set(TARGETS)
+    assert metrics.loc[metrics["band"] == "All", "n"].tolist() == [300] * 3
+
+@pytest.mark.parametrize("offset", [-0.5, 0.0, 0.5, 1.0])
+def test_band_labels_agree_with_get_aqi_status_at_the_edges(offset):
+    edges = [upper for upper, *_ in AQI_BANDS if np.isfinite(upper)]
+    values = np.array([0.0] + [edge + offset for edge in edges] + [1000.0])
+    expected = [get_aqi_status(value)[0] for value in values]
+    assert backtesting.band_labels(values).tolist() == expected
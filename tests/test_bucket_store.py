@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import bucket_store
+import data_access
+import feature_store
+
+START = datetime(2025, 1, 1)
+
+def readings(hours, aqi=50.0):
+    return [
+        {"time": START + timedelta(hours=h), "co": 1.0, "no2": 2.0, "o3": 3.0,
+         "pm10": 4.0, "pm2_5": 5.0, "so2": 6.0, "aqi": aqi + h}
+        for h in hours
+    ]
+
+def collections(db):
+    return db[bucket_store.FLAT_COLLECTION], db[bucket_store.BUCKET_COLLECTION]
+
+def test_compact_folds_closed_days_and_trims_flat_readings(db):
+    flat, buckets = collections(db)
+    data_access.upsert_readings(flat, readings(range(0, 24 * 5 + 3)))
+
+    result = bucket_store.compact(flat, buckets, retention_days=2)
+    # Day 5 is still open; days 0-4 are bucketed, days before day 3 trimmed
+    assert result == {"buckets": 5, "deleted": 24 * 3}
+    assert bucket_store.bucket_watermark(buckets) == START + timedelta(days=5)
+    assert bucket_store.layout_stats(flat, buckets)["bucketed_readings"] == 24 * 5
+
+    bucket = buckets.find_one({"_id": START})
+    assert bucket["count"] == 24
+    assert bucket["summary"]["aqi"] == {"min": 50.0, "max": 73.0, "mean": 61.5, "count": 24}
+
+    # Idempotent
+    assert bucket_store.compact(flat, buckets, retention_days=2) == {"buckets": 2, "deleted": 0}
+    assert bucket_store.layout_stats(flat, buckets)["bucketed_readings"] == 24 * 5
+
+def test_read_range_joins_buckets_and_flat_tail(db):
+    flat, buckets = collections(db)
+    data_access.upsert_readings(flat, readings(range(0, 24 * 4)))
+    flat.update_one({"time": START + timedelta(hours=5)}, {"$unset": {"pm10": ""}})
+    bucket_store.compact(flat, buckets, retention_days=1)
+
+    df = bucket_store.read_range(flat, buckets)
+    assert len(df) == 24 * 4
+    assert df["time"].is_unique and df["time"].is_monotonic_increasing
+    assert df["aqi"].tolist() == [50.0 + h for h in range(24 * 4)]
+    assert np.isnan(df.loc[5, "pm10"])
+
+    # A range straddling the bucket watermark (start of day 3)
+    df = bucket_store.read_range(flat, buckets, START + timedelta(hours=60), START + timedelta(hours=80))
+    assert df["aqi"].tolist() == [50.0 + h for h in range(60, 81)]
+
+def test_late_backfill_survives_compaction_until_the_mirror_syncs(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(bucket_store, "STORAGE_LAYOUT", "bucketed")
+    flat, buckets = collections(db)
+    data_access.upsert_readings(flat, readings(range(24 * 40, 24 * 50)))
+    feature_store.sync(flat, tmp_path)
+
+    # A backfill far older than the flat retention, written after the sync
+    data_access.upsert_readings(flat, readings(range(0, 24 * 3)))
+    bucket_store.compact(
+        flat, buckets, retention_days=35,
+        keep_ingested_after=feature_store.read_ingest_watermark(tmp_path)
+    )
+    feature_store.sync(flat, tmp_path)
+
+    mirrored = feature_store.read_store(tmp_path)
+    assert len(mirrored) == bucket_store.layout_stats(flat, buckets)["bucketed_readings"] + 24 == 24 * 13
+
+    # Once mirrored, the next compaction may trim them
+    result = bucket_store.compact(
+        flat, buckets, retention_days=35,
+        keep_ingested_after=feature_store.read_ingest_watermark(tmp_path)
+    )
+    assert result["deleted"] == 24 * 3
+
+def test_merge_aggregates_weights_a_week_straddling_the_watermark():
+    week = datetime(2025, 1, 6)
+    rows = [
+        {"time": week - timedelta(days=7), "aqi_mean": 10.0, "aqi_max": 20.0, "count": 168},
+        {"time": week, "aqi_mean": 40.0, "aqi_max": 60.0, "count": 72}
+    ]
+    tail = [
+        {"time": week, "aqi_mean": 80.0, "aqi_max": 90.0, "count": 24},
+        {"time": week + timedelta(days=7), "aqi_mean": 5.0, "aqi_max": 6.0, "count": 3}
+    ]
+    merged = bucket_store.merge_aggregates(rows, tail)
+    assert [row["time"] for row in merged] == [week - timedelta(days=7), week, week + timedelta(days=7)]
+    assert merged[1] == {"time": week, "aqi_mean": 50.0, "aqi_max": 90.0, "count": 96}
+
+def test_aggregate_range_matches_flat_aggregation(mongod_db, monkeypatch):
+    flat, buckets = collections(mongod_db)
+    data_access.upsert_readings(flat, readings(range(0, 24 * 20)))
+    end = START + timedelta(hours=24 * 20 - 1)
+    expected = {unit: data_access.aggregate_readings(flat, START, end, unit) for unit in ["day", "week"]}
+
+    bucket_store.compact(flat, buckets, retention_days=3)
+    monkeypatch.setattr(bucket_store, "STORAGE_LAYOUT", "bucketed")
+    for unit in ["day", "week"]:
+        got = bucket_store.aggregate_range(flat, START, end, unit)
+        assert [row["time"] for row in got] == [row["time"] for row in expected[unit]]
+        for row, want in zip(got, expected[unit]):
+            assert row["count"] == want["count"]
+            assert row["aqi_max"] == want["aqi_max"]
+            assert row["aqi_mean"] == pytest.approx(want["aqi_mean"])
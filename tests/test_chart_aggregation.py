@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_access
+from chart_options import CHART_RANGES, CHART_RESOLUTIONS, MAX_CHART_POINTS, chart_resolutions
+
+START = datetime(2025, 1, 1)
+
+def test_chart_resolutions_stay_under_the_point_budget():
+    assert chart_resolutions(CHART_RANGES["24 hours"]) == ["Hourly", "Daily", "Weekly"]
+    assert chart_resolutions(CHART_RANGES["30 days"]) == ["Daily", "Weekly"]
+    assert chart_resolutions(CHART_RANGES["1 year"]) == ["Daily", "Weekly"]
+    assert chart_resolutions(CHART_RANGES["5 years"]) == ["Weekly"]
+    # Exactly at the budget is still offered
+    assert chart_resolutions(MAX_CHART_POINTS) == ["Hourly", "Daily", "Weekly"]
+    assert chart_resolutions(MAX_CHART_POINTS + 1) == ["Daily", "Weekly"]
+
+    for hours in CHART_RANGES.values():
+        for label in chart_resolutions(hours):
+            assert hours / CHART_RESOLUTIONS[label][1] <= MAX_CHART_POINTS
+
+@pytest.mark.parametrize("unit", ["hour", "day", "week"])
+def test_aggregate_readings_matches_pandas(mongod_db, unit):
+    collection = mongod_db["karachi_aqi_etl"]
+    rng = np.random.default_rng(0)
+    aqi = rng.uniform(10, 300, 24 * 30)
+    data_access.upsert_readings(collection, [
+        {"time": START + timedelta(hours=h), "aqi": float(value)} for h, value in enumerate(aqi)
+    ])
+    start, end = START + timedelta(hours=5), START + timedelta(days=20, hours=7)
+
+    rows = data_access.aggregate_readings(collection, start, end, unit)
+
+    series = pd.Series(aqi, index=pd.date_range(START, periods=len(aqi), freq="h"))[start:end]
+    if unit == "week":
+        # Weeks start on Monday, like $dateTrunc with startOfWeek "monday"
+        keys = series.index.normalize() - pd.to_timedelta(series.index.dayofweek, unit="D")
+    else:
+        keys = series.index.floor("h" if unit == "hour" else "D")
+    grouped = series.groupby(keys)
+    assert [row["time"] for row in rows] == list(grouped.mean().index.to_pydatetime())
+    np.testing.assert_allclose([row["aqi_mean"] for row in rows], grouped.mean().to_numpy())
+    assert [row["aqi_max"] for row in rows] == grouped.max().tolist()
+    assert [row["count"] for row in rows] == grouped.size().tolist()
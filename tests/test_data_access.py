@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import data_access
+
+START = datetime(2025, 1, 1)
+
+def reading(hours, aqi=50.0, minutes=0):
+    return {"time": START + timedelta(hours=hours, minutes=minutes), "aqi": aqi, "pm10": 10.0}
+
+def test_upsert_dedupes_and_reports_counts(db):
+    collection = db["karachi_aqi_etl"]
+    data_access.ensure_time_index(collection)
+
+    # Two records for the same hour within one call: the last wins
+    counts = data_access.upsert_readings(collection, [reading(0), reading(1), reading(1, aqi=60.0, minutes=20)])
+    assert counts == {"inserted": 2, "updated": 0, "skipped": 1}
+
+    counts = data_access.upsert_readings(collection, [reading(0), reading(1, aqi=70.0), reading(2)])
+    assert counts == {"inserted": 1, "updated": 1, "skipped": 1}
+
+    docs = list(collection.find({}, data_access.READING_PROJECTION).sort("time", 1))
+    assert [doc["time"] for doc in docs] == [START, START + timedelta(hours=1), START + timedelta(hours=2)]
+    assert [doc["aqi"] for doc in docs] == [50.0, 70.0, 50.0]
+
+def test_upsert_keys_on_city_and_hour(db):
+    collection = db["city_aqi_etl"]
+    data_access.ensure_time_index(collection, key_fields=("city", "time"))
+    records = [{**reading(0), "city": city} for city in ["Karachi", "Lahore"]]
+
+    assert data_access.upsert_readings(collection, records, key_fields=("city", "time"))["inserted"] == 2
+    assert data_access.upsert_readings(collection, records, key_fields=("city", "time"))["skipped"] == 2
+    assert collection.count_documents({}) == 2
+
+def test_deduplicate_hours_migrates_legacy_documents(db):
+    collection = db["karachi_aqi_etl"]
+    collection.insert_many([reading(0, aqi=1.0), reading(0, aqi=2.0, minutes=30), reading(1, minutes=5)])
+
+    assert data_access.deduplicate_hours(collection) == 1
+    data_access.ensure_time_index(collection)
+
+    docs = list(collection.find({}, {"_id": 0}).sort("time", 1))
+    assert [(doc["time"], doc["aqi"]) for doc in docs] == [(START, 2.0), (START + timedelta(hours=1), 50.0)]
+
+def test_unique_index_refuses_duplicate_hours(db):
+    collection = db["karachi_aqi_etl"]
+    collection.insert_many([reading(0), reading(0)])
+    with pytest.raises(RuntimeError):
+        data_access.ensure_time_index(collection)
+
+def test_latest_readings_and_scan_range(db):
+    collection = db["karachi_aqi_etl"]
+    data_access.upsert_readings(collection, [reading(h, aqi=float(h)) for h in range(10)])
+
+    assert [doc["aqi"] for doc in data_access.latest_readings(collection, 3)] == [7.0, 8.0, 9.0]
+    scanned = data_access.scan_range(collection, after=START + timedelta(hours=2), until=START + timedelta(hours=4))
+    assert [doc["aqi"] for doc in scanned] == [3.0, 4.0]
+
+def test_scan_changes_returns_corrected_and_unstamped_hours(db):
+    collection = db["karachi_aqi_etl"]
+    data_access.upsert_readings(collection, [reading(h, aqi=float(h)) for h in range(6)])
+    collection.insert_one(reading(8, aqi=8.0))  # written before ingestion stamps
+    synced = data_access.utc_now() + data_access.INGEST_LAG + timedelta(seconds=1)
+
+    assert [doc["aqi"] for doc in data_access.scan_changes(collection, synced, START + timedelta(hours=5))] == [8.0]
+    assert [doc["aqi"] for doc in data_access.scan_changes(collection, synced, START + timedelta(hours=8))] == []
+
+    collection.update_many({}, {"$set": {data_access.INGESTED_FIELD: datetime(2000, 1, 1)}})
+    data_access.upsert_readings(collection, [reading(1, aqi=99.0), reading(7, aqi=7.0)])
+    changed = data_access.scan_changes(collection, datetime(2001, 1, 1), query={"time": {"$gte": START + timedelta(hours=1)}})
+    assert [doc["aqi"] for doc in changed] == [99.0, 7.0]
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+import data_access
+import etl_buffer
+
+START = datetime(2025, 1, 1)
+
+def reading(hours, aqi=50.0):
+    return {"time": START + timedelta(hours=hours), "aqi": aqi, "pm10": 10.0}
+
+@pytest.fixture
+def buffer_path(tmp_path):
+    return str(tmp_path / "buffer.sqlite3")
+
+def test_flush_writes_oldest_first_and_empties_the_buffer(db, buffer_path):
+    etl_buffer.append("karachi_aqi_etl", [reading(2), reading(0)], path=buffer_path)
+    etl_buffer.append("karachi_aqi_etl", [reading(1)], path=buffer_path)
+    seen = []
+
+    flushed = etl_buffer.flush(db, on_batch=lambda name, records: seen.extend(r["time"] for r in records),
+                               path=buffer_path)
+
+    assert flushed == {"karachi_aqi_etl": {"inserted": 3, "updated": 0, "skipped": 0}}
+    assert seen == [START, START + timedelta(hours=1), START + timedelta(hours=2)]
+    assert etl_buffer.pending(buffer_path)[0] == 0
+
+def test_interrupted_flush_is_replayed(db, buffer_path, monkeypatch):
+    etl_buffer.append("karachi_aqi_etl", [reading(h) for h in range(5)], path=buffer_path)
+
+    # The connection drops on the second batch, after the first was written
+    upsert = data_access.upsert_readings
+    calls = []
+    def flaky_upsert(collection, records, **kwargs):
+        calls.append(len(records))
+        if len(calls) == 2:
+            raise AutoReconnect("connection reset")
+        return upsert(collection, records, **kwargs)
+    monkeypatch.setattr(etl_buffer, "upsert_readings", flaky_upsert)
+
+    with pytest.raises(AutoReconnect):
+        etl_buffer.flush(db, path=buffer_path, batch_size=2)
+    assert db["karachi_aqi_etl"].count_documents({}) == 2
+    assert etl_buffer.pending(buffer_path)[0] == 3
+
+    flushed = etl_buffer.flush(db, path=buffer_path, batch_size=2)
+    assert flushed["karachi_aqi_etl"]["inserted"] == 3
+    assert db["karachi_aqi_etl"].count_documents({}) == 5
+    assert etl_buffer.pending(buffer_path)[0] == 0
+
+def test_failed_batch_callback_keeps_readings_buffered(db, buffer_path):
+    etl_buffer.append("karachi_aqi_etl", [reading(0)], path=buffer_path)
+
+    def fail(name, records):
+        raise AutoReconnect("feature state write failed")
+    with pytest.raises(AutoReconnect):
+        etl_buffer.flush(db, on_batch=fail, path=buffer_path)
+    assert etl_buffer.pending(buffer_path)[0] == 1
+
+    # Replaying the already-written reading is a no-op upsert
+    assert etl_buffer.flush(db, path=buffer_path)["karachi_aqi_etl"]["skipped"] == 1
+
+def test_rebuffered_hour_replaces_the_pending_reading(db, buffer_path):
+    etl_buffer.append("karachi_aqi_etl", [reading(0, aqi=50.0)], path=buffer_path)
+    etl_buffer.append("karachi_aqi_etl", [reading(0, aqi=80.0)], path=buffer_path)
+    assert etl_buffer.pending(buffer_path)[0] == 1
+
+    etl_buffer.flush(db, path=buffer_path)
+    assert db["karachi_aqi_etl"].find_one()["aqi"] == 80.0
+
+def test_flush_due_thresholds(buffer_path):
+    assert not etl_buffer.flush_due(buffer_path, min_rows=1, max_age=3600)
+    etl_buffer.append("karachi_aqi_etl", [reading(0)], path=buffer_path)
+    assert not etl_buffer.flush_due(buffer_path, min_rows=2, max_age=3600)
+    assert etl_buffer.flush_due(buffer_path, min_rows=2, max_age=0)
+    assert etl_buffer.flush_due(buffer_path, min_rows=1, max_age=3600)
@@ -0,0 +1,94 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import data_access
+import etl
+
+def payload(aqi):
+    return {
+        **{field.rsplit(".", 1)[0]: {"concentration": float(aqi) / 10} for field in etl.FIELD_MAP if "." in field},
+        "overall_aqi": aqi
+    }
+
+class MockApi:
+    """
+    Stand-in for api-ninjas: a slow response per city, one flaky city that
+    answers 503 once, one that always fails with 500 and one unknown (400)
+    """
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle(self, request):
+        city = request.query["city"]
+        self.calls[city] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+
+        if city == "Atlantis":
+            return web.json_response({"error": "unknown city"}, status=400)
+        if city == "Down" or (city == "Flaky" and self.calls[city] == 1):
+            return web.json_response({"error": "unavailable"}, status=503 if city == "Flaky" else 500)
+        return web.json_response(payload(100 + len(city)))
+
+def extract(api, cities, concurrency):
+    async def run():
+        app = web.Application()
+        app.router.add_get("/v1/airquality", api.handle)
+        async with TestServer(app) as server:
+            return await etl.extract_cities(str(server.make_url("/v1/airquality")), cities, concurrency)
+    return asyncio.run(run())
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(etl, "RETRY_BACKOFF", 0.001)
+
+def test_cities_are_fetched_concurrently_up_to_the_limit():
+    api = MockApi()
+    cities = [f"City{i}" for i in range(8)]
+    results = extract(api, cities, concurrency=3)
+
+    assert [city for city, _ in results] == cities
+    assert all(data is not None for _, data in results)
+    assert api.max_in_flight == 3
+
+def test_only_transient_failures_are_retried():
+    api = MockApi(delay=0)
+    results = dict(extract(api, ["Karachi", "Flaky", "Down", "Atlantis"], concurrency=4))
+
+    assert results["Flaky"]["overall_aqi"] == 105
+    assert results["Down"] is None and results["Atlantis"] is None
+    assert api.calls == {"Karachi": 1, "Flaky": 2, "Down": etl.RETRIES, "Atlantis": 1}
+
+def test_failed_city_is_dropped_and_the_rest_upserted(db, tmp_path, monkeypatch):
+    # The ETL buffer lives in the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(etl, "get_database", lambda: db)
+
+    api = MockApi(delay=0)
+    records = etl.transform_cities(extract(api, ["Karachi", "Lahore", "Atlantis"], concurrency=2))
+    assert [record["city"] for record in records] == ["Karachi", "Lahore"]
+    assert records[0]["aqi"] == 107 and records[0]["pm2_5"] == pytest.approx(10.7)
+
+    etl.load_cities(records)
+    # Rerunning the same hour updates in place: one document per (city, hour)
+    etl.load_cities(records)
+
+    cities = list(db[data_access.CITY_COLLECTION].find({}, {"_id": 0, "city": 1, "aqi": 1}).sort("city", 1))
+    assert cities == [{"city": "Karachi", "aqi": 107}, {"city": "Lahore", "aqi": 106}]
+    karachi = list(db[data_access.READINGS_COLLECTION].find({}, data_access.READING_PROJECTION))
+    assert len(karachi) == 1 and "city" not in karachi[0]
+    assert karachi[0]["time"] == records[0]["time"]
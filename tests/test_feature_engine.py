@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_engine import FEATURES, build_features, build_incremental_features, latest_feature_row
+
+def make_readings(n_rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "time": pd.date_range("2025-01-01", periods=n_rows, freq="h"),
+        **{name: rng.uniform(1, 200, n_rows) for name in ["co", "no2", "o3", "pm10", "pm2_5", "so2", "aqi"]}
+    })
+    df.loc[rng.choice(n_rows, 20, replace=False), "pm10"] = np.nan
+    return df
+
+@pytest.mark.parametrize("n", [1, 5, 24])
+def test_incremental_features_match_batch_bit_for_bit(n):
+    df = make_readings()
+    batch = build_features(df).tail(n)
+    incremental = build_incremental_features(df, n)
+    pd.testing.assert_frame_equal(incremental, batch, check_exact=True)
+
+def test_latest_feature_row_skips_incomplete_rows():
+    df = make_readings()
+    df.loc[df.index[-2:], "pm10"] = np.nan
+
+    latest = latest_feature_row(df)
+    expected = build_features(df).dropna(subset=FEATURES).iloc[-1:]
+    pd.testing.assert_frame_equal(latest, expected, check_exact=True)
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import data_access
+import feature_store
+
+START = datetime(2025, 1, 1)
+
+def readings(hours, aqi=50.0):
+    return [
+        {"time": START + timedelta(hours=h), "co": 1.0, "no2": 2.0, "o3": 3.0,
+         "pm10": 4.0, "pm2_5": 5.0, "so2": 6.0, "aqi": aqi + h}
+        for h in hours
+    ]
+
+def test_incremental_sync_picks_up_late_and_corrected_readings(db, tmp_path):
+    collection = db["karachi_aqi_etl"]
+    data_access.upsert_readings(collection, readings(range(24, 48)))
+    assert feature_store.sync(collection, tmp_path) == 24
+
+    # A backfilled day before the watermark, a corrected hour and a new one
+    data_access.upsert_readings(collection, readings(range(0, 24)))
+    data_access.upsert_readings(collection, [{**readings([30])[0], "aqi": 999.0}])
+    data_access.upsert_readings(collection, readings([48]))
+    feature_store.sync(collection, tmp_path)
+
+    df = feature_store.read_store(tmp_path)
+    assert len(df) == 49
+    assert df["time"].is_unique
+    assert df.loc[df["time"] == START + timedelta(hours=30), "aqi"].item() == 999.0
+    assert feature_store.read_watermark(tmp_path) == START + timedelta(hours=48)
+
+def test_unchanged_readings_are_not_restamped(db):
+    collection = db["karachi_aqi_etl"]
+    data_access.upsert_readings(collection, readings(range(3)))
+    stamps = [doc[data_access.INGESTED_FIELD] for doc in collection.find().sort("time", 1)]
+
+    counts = data_access.upsert_readings(collection, readings(range(3)))
+    assert counts == {"inserted": 0, "updated": 0, "skipped": 3}
+    assert [doc[data_access.INGESTED_FIELD] for doc in collection.find().sort("time", 1)] == stamps
+
+def test_mirrors_from_before_ingestion_stamps_still_sync(db, tmp_path):
+    collection = db["karachi_aqi_etl"]
+    collection.insert_many(readings(range(3)))
+    feature_store.sync(collection, tmp_path)
+    # Watermark written by an older version: reading time only
+    feature_store.write_watermark(START + timedelta(hours=2), tmp_path)
+
+    collection.insert_many(readings([3]))
+    data_access.upsert_readings(collection, readings([1], aqi=70.0))
+    feature_store.sync(collection, tmp_path)
+
+    df = feature_store.read_store(tmp_path)
+    assert df["aqi"].tolist() == [50.0, 71.0, 52.0, 53.0]
@@ -0,0 +1,171 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+# Needs aiohttp and mlflow from requirements.txt
+forecast_service = pytest.importorskip("forecast_service")
+from aiohttp.test_utils import TestClient, TestServer
+
+START = datetime(2025, 1, 1)
+CITIES = ["Lahore", "Islamabad", "Quetta"]
+
+class StubModel:
+    """
+    sklearn-style model that records the row count of every predict call
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, X):
+        self.calls.append(len(X))
+        total = X.sum(axis=1)
+        return np.column_stack([total, total + 1, total + 2])
+
+def readings(hours, offset=0.0):
+    rng = np.random.default_rng(int(offset))
+    return [
+        {"time": START + timedelta(hours=h), "co": 1.0, "no2": 2.0, "o3": 3.0, "pm10": 4.0,
+         "pm2_5": 5.0, "so2": 6.0, "aqi": 50.0 + offset + rng.uniform(0, 10)}
+        for h in range(hours)
+    ]
+
+@pytest.fixture
+def seeded(db):
+    db[forecast_service.KARACHI_COLLECTION].insert_many(readings(100))
+    db[forecast_service.CITY_COLLECTION].insert_many([
+        {**reading, "city": city} for i, city in enumerate(CITIES) for reading in readings(100, 10.0 * (i + 1))
+    ])
+    return db
+
+def serve(db, model=None, scenario=None, window=None):
+    """
+    Runs `scenario(client, service)` against the app on a local test server
+    """
+    async def run():
+        app = forecast_service.create_app(db, model)
+        service = app["service"]
+        if window is not None:
+            service.batcher.window = window
+        async with TestClient(TestServer(app)) as client:
+            return await scenario(client, service)
+    return asyncio.run(run())
+
+def forecast_model(version="1"):
+    return forecast_service.ForecastModel(version, model=StubModel())
+
+def test_concurrent_misses_are_scored_in_one_batch(seeded):
+    model = forecast_model()
+
+    async def scenario(client, service):
+        responses = await asyncio.gather(*[
+            client.get("/forecast", params={"city": city}) for city in ["Karachi", *CITIES]
+        ])
+        return [await response.json() for response in responses]
+
+    bodies = serve(seeded, model, scenario, window=0.05)
+    assert model.model.calls == [4]
+    assert [body["city"] for body in bodies] == ["Karachi", *CITIES]
+    assert all(len(body["predictions"]) == 3 for body in bodies)
+    # Rows came back to the request that submitted them
+    assert len({body["predictions"][0]["aqi"] for body in bodies}) == 4
+
+def test_responses_are_cached_per_city_watermark_and_model_version(seeded):
+    model = forecast_model("1")
+
+    async def scenario(client, service):
+        first = await (await client.get("/forecast")).json()
+        again = await (await client.get("/forecast")).json()
+        calls_before_swap = list(model.model.calls)
+
+        # A new registered version is a new cache key
+        service.model = forecast_model("2")
+        swapped = await (await client.get("/forecast")).json()
+
+        # A new reading moves the input watermark once the poll expires
+        seeded[forecast_service.KARACHI_COLLECTION].insert_one({**readings(101)[-1], "aqi": 80.0})
+        service.contexts.clear()
+        newer = await (await client.get("/forecast")).json()
+        stats = await (await client.get("/stats")).json()
+        return first, again, calls_before_swap, swapped, newer, stats, service
+
+    first, again, calls_before_swap, swapped, newer, stats, service = serve(seeded, model, scenario)
+    assert again == first
+    assert calls_before_swap == [1]
+    assert swapped["model_version"] == "2"
+    assert newer["input_watermark"] == (START + timedelta(hours=100)).isoformat()
+    assert len(service.model.model.calls) == 2
+    assert stats["cache_hits"] == 1
+    assert stats["requests"] == 4
+    assert stats["batches"] == 3
+
+def test_bad_timestamp_and_unknown_city(seeded):
+    async def scenario(client, service):
+        bad = await client.get("/forecast", params={"at": "not-a-time"})
+        unknown = await client.get("/forecast", params={"city": "Atlantis"})
+        before = await client.get("/forecast", params={"at": "2024-06-01T00:00"})
+        stats = await (await client.get("/stats")).json()
+        return bad.status, unknown.status, before.status, stats
+
+    bad, unknown, before, stats = serve(seeded, forecast_model(), scenario)
+    assert (bad, unknown, before) == (400, 404, 404)
+    assert stats["errors"] == 3
+    assert stats["requests"] == 3
+
+def test_historical_forecast_uses_readings_up_to_at(seeded):
+    async def scenario(client, service):
+        response = await client.get("/forecast", params={"city": "Lahore", "at": "2025-01-03T05:30"})
+        return await response.json()
+
+    body = serve(seeded, forecast_model(), scenario)
+    assert body["input_watermark"] == "2025-01-03T05:00:00"
+
+def test_health_reports_loading_until_the_first_model_is_loaded(seeded, monkeypatch):
+    released = threading.Event()
+
+    def latest_version():
+        released.wait(5)
+        return 3
+
+    monkeypatch.setattr(forecast_service.model_cache, "get_latest_version", latest_version)
+    monkeypatch.setattr(forecast_service.ForecastModel, "load", classmethod(lambda cls, version: forecast_model(version)))
+
+    async def scenario(client, service):
+        loading = await (await client.get("/health")).json()
+        forecast = await client.get("/forecast")
+        released.set()
+        for _ in range(100):
+            if service.model is not None:
+                break
+            await asyncio.sleep(0.01)
+        ready = await (await client.get("/health")).json()
+        return loading, forecast.status, ready
+
+    loading, forecast_status, ready = serve(seeded, None, scenario)
+    assert loading == {"status": "loading", "model_version": None}
+    assert forecast_status == 503
+    assert ready == {"status": "ok", "model_version": "3"}
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = forecast_service.LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+def test_latency_percentiles():
+    stats = forecast_service.LatencyStats(samples=100)
+    assert stats.snapshot()["latency_ms_p50"] == 0.0
+    for ms in range(1, 201):
+        stats.record(ms / 1000)
+
+    snapshot = stats.snapshot()
+    # Only the newest `samples` latencies (101..200 ms) count
+    assert snapshot["requests"] == 200
+    assert snapshot["latency_ms_p50"] == pytest.approx(150.5)
+    assert snapshot["latency_ms_p99"] == pytest.approx(199.01)
@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.multioutput import MultiOutputRegressor
+
+mlflow = pytest.importorskip("mlflow")
+
+import model_cache
+import prediction_intervals
+import tree_runtime
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    # Local file-based registry: sqlite metadata, artifacts on disk
+    monkeypatch.setenv("MLFLOW_ARTIFACT_ROOT", str(tmp_path / "artifacts"))
+    uri = f"sqlite:///{tmp_path / 'mlflow.db'}"
+    mlflow.set_tracking_uri(uri)
+    mlflow.set_registry_uri(uri)
+    mlflow.set_experiment("aqi-test")
+    yield tmp_path
+    mlflow.set_tracking_uri(None)
+    mlflow.set_registry_uri(None)
+
+def register(tmp_path, n_estimators, runtime=True, calibration=None):
+    rng = np.random.default_rng(n_estimators)
+    X, y = rng.normal(size=(60, 4)), rng.normal(size=(60, 3))
+    model = MultiOutputRegressor(RandomForestRegressor(n_estimators=n_estimators, max_depth=3, random_state=0)).fit(X, y)
+
+    with mlflow.start_run():
+        mlflow.sklearn.log_model(
+            model, artifact_path="model", registered_model_name=model_cache.MODEL_NAME,
+            # Skips requirements inference, which dominates the test time
+            serialization_format="cloudpickle", pip_requirements=[]
+        )
+        if runtime:
+            path = tmp_path / tree_runtime.RUNTIME_FILE
+            tree_runtime.save_runtime(tree_runtime.export_model(model), path)
+            mlflow.log_artifact(str(path), artifact_path=tree_runtime.RUNTIME_ARTIFACT_PATH)
+        if calibration:
+            path = tmp_path / prediction_intervals.CALIBRATION_FILE
+            path.write_text(json.dumps(calibration))
+            mlflow.log_artifact(str(path), artifact_path=prediction_intervals.CALIBRATION_ARTIFACT_PATH)
+    return model, X
+
+def test_latest_version_is_downloaded_once_and_cached(registry, monkeypatch):
+    cache_dir = str(registry / "cache")
+    calibration = {"alpha": 0.1, "normalized": True, "quantiles": [1.0, 2.0, 3.0]}
+    register(registry, 3)
+    model, X = register(registry, 5, calibration=calibration)
+
+    loaded, version = model_cache.load_latest_model(cache_dir=cache_dir)
+    assert version == "2"
+    np.testing.assert_allclose(loaded.predict(X), model.predict(X))
+    assert model_cache.cached_versions(cache_dir=cache_dir) == ["2"]
+
+    runtime = model_cache.load_runtime(model_cache.MODEL_NAME, version, cache_dir)
+    np.testing.assert_allclose(tree_runtime.predict(runtime, X), model.predict(X), rtol=1e-9)
+    assert model_cache.load_calibration(model_cache.MODEL_NAME, version, cache_dir) == calibration
+
+    # Version 1 was logged without a calibration
+    assert model_cache.load_calibration(model_cache.MODEL_NAME, "1", cache_dir) is None
+
+    # Cached: a second load does not download again
+    def no_download(*args, **kwargs):
+        raise AssertionError("downloaded a cached version")
+    monkeypatch.setattr(mlflow.artifacts, "download_artifacts", no_download)
+    model_cache.load_latest_model(cache_dir=cache_dir)
+    assert model_cache.load_runtime(model_cache.MODEL_NAME, version, cache_dir) is not None
+
+def test_versions_without_a_runtime(registry):
+    register(registry, 3, runtime=False)
+    assert model_cache.load_runtime(model_cache.MODEL_NAME, "1", str(registry / "cache")) is None
+
+def test_falls_back_to_the_newest_cached_version_when_the_registry_is_down(registry, monkeypatch):
+    cache_dir = str(registry / "cache")
+    register(registry, 3)
+    model, X = register(registry, 5)
+    model_cache.load_model(model_cache.MODEL_NAME, "1", cache_dir)
+    model_cache.load_latest_model(cache_dir=cache_dir)
+
+    # Nothing listens on this port
+    monkeypatch.setenv("MLFLOW_HTTP_REQUEST_MAX_RETRIES", "0")
+    mlflow.set_tracking_uri("http://127.0.0.1:9")
+    mlflow.set_registry_uri("http://127.0.0.1:9")
+
+    loaded, version = model_cache.load_latest_model(cache_dir=cache_dir)
+    assert version == "2"
+    np.testing.assert_allclose(loaded.predict(X), model.predict(X))
+
+    # With an empty cache there is nothing to fall back to
+    with pytest.raises(Exception):
+        model_cache.load_latest_model(cache_dir=str(registry / "empty"))
@@ -0,0 +1,195 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.multioutput import MultiOutputRegressor
+from sklearn.svm import SVR
+
+# Needs mlflow, dagshub and xgboost from requirements.txt
+model_training = pytest.importorskip("model_training")
+
+def make_frame(n_rows=500):
+    frame = pd.DataFrame(
+        np.arange(n_rows * len(model_training.FEATURES), dtype=float).reshape(n_rows, -1),
+        columns=model_training.FEATURES
+    )
+    for i, target in enumerate(model_training.TARGETS):
+        frame[target] = np.arange(n_rows, dtype=float) + i
+    return frame
+
+def make_series(n_rows=600, seed=0):
+    # Learnable synthetic training frame with an hourly `time` column
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, len(model_training.FEATURES)))
+    frame = pd.DataFrame(X, columns=model_training.FEATURES)
+    for i, target in enumerate(model_training.TARGETS):
+        frame[target] = 3 * X[:, i] + X[:, i + 1] + rng.normal(scale=0.3, size=n_rows)
+    frame.insert(0, "time", pd.date_range("2025-01-01", periods=n_rows, freq="h"))
+    return frame
+
+def forest(X, y):
+    return MultiOutputRegressor(RandomForestRegressor(n_estimators=10, max_depth=6, random_state=0)).fit(X, y)
+
+def full_refit(df):
+    X_train, X_test, y_train, y_test = model_training.data_splitting(df)
+    _, X_cal, _, _ = model_training.calibration_splitting(X_test, y_test)
+    return forest(X_train, y_train), model_training.full_refit_tags(df, X_cal), X_train
+
+def registered(monkeypatch, model, tags, r2=None):
+    run = SimpleNamespace(data=SimpleNamespace(tags=tags, metrics={} if r2 is None else {"r2": r2}))
+    monkeypatch.setattr(model_training, "load_previous_model", lambda: (model, "3", run))
+
+def test_calibration_slice_is_newest_and_disjoint_from_selection():
+    df = make_frame()
+    X_train, X_test, y_train, y_test = model_training.data_splitting(df)
+    X_test, X_cal, y_test, y_cal = model_training.calibration_splitting(X_test, y_test)
+
+    assert len(X_train) + len(X_test) + len(X_cal) == len(df)
+    assert len(X_cal) == len(y_cal) > 0 and len(X_test) > 0
+    # Time order: train, then model selection, then calibration
+    assert X_train.index.max() < X_test.index.min()
+    assert X_test.index.max() < X_cal.index.min()
+    assert X_cal.index.max() == df.index.max()
+    assert (y_cal.index == X_cal.index).all()
+
+def test_warm_start_update_grows_each_family():
+    df = make_series(300)
+    X, y = df[model_training.FEATURES], df[model_training.TARGETS]
+
+    model = forest(X[:200], y[:200])
+    updated = model_training.warm_start_update(model, X[200:], y[200:])
+    assert [estimator.n_estimators for estimator in updated.estimators_] == [
+        10 + model_training.INCREMENTAL_FOREST_TREES
+    ] * len(model_training.TARGETS)
+    assert len(updated.estimators_[0].estimators_) == 10 + model_training.INCREMENTAL_FOREST_TREES
+
+    xgb = pytest.importorskip("xgboost")
+    boosted = MultiOutputRegressor(xgb.XGBRegressor(n_estimators=5, max_depth=3)).fit(X[:200], y[:200])
+    updated = model_training.warm_start_update(boosted, X[200:], y[200:])
+    assert updated.estimators_[0].get_booster().num_boosted_rounds() == 5 + model_training.INCREMENTAL_XGBOOST_ROUNDS
+
+    svr = MultiOutputRegressor(SVR()).fit(X[:200], y[:200])
+    assert model_training.warm_start_update(svr, X[200:], y[200:]) is None
+
+def test_first_incremental_run_trains_only_rows_after_the_full_refit(monkeypatch):
+    df = make_series(600)
+    model, tags, X_train = full_refit(df)
+    assert pd.Timestamp(tags["train_watermark"]) == df["time"].max()
+
+    # No new rows yet: the held-out rows are not "new"
+    registered(monkeypatch, model, tags)
+    assert model_training.incremental_update(df) == "skip"
+
+    later = make_series(648, seed=0)
+    trained_rows = []
+    original = model_training.warm_start_update
+    def spy(model, X_new, y_new):
+        trained_rows.append(X_new.index)
+        return original(model, X_new, y_new)
+    monkeypatch.setattr(model_training, "warm_start_update", spy)
+    model, _, _, _, params, new_tags, calibration = model_training.incremental_update(later)
+
+    assert params["new_rows"] == 48
+    assert list(trained_rows[0]) == list(range(600, 648))
+    assert new_tags["train_watermark"] == later["time"].max().isoformat()
+    assert new_tags["calibration_start"] == tags["calibration_start"]
+    assert new_tags["last_full_refit"] == tags["last_full_refit"]
+
+    # Recalibrated for the updated model on the untouched calibration rows
+    window = later[(later["time"] >= pd.Timestamp(tags["calibration_start"]))
+                   & (later["time"] <= pd.Timestamp(tags["calibration_end"]))]
+    assert window.index.min() > X_train.index.max()
+    expected = model_training.prediction_intervals.calibrate(
+        model, window[model_training.FEATURES], window[model_training.TARGETS]
+    )
+    assert calibration == expected
+
+def test_incremental_update_falls_back_to_a_full_refit(monkeypatch):
+    df = make_series(648)
+    model, tags, _ = full_refit(df[:600])
+
+    registered(monkeypatch, model, {k: v for k, v in tags.items() if k != "calibration_start"})
+    assert model_training.incremental_update(df) is None
+
+    stale = {**tags, "last_full_refit": (pd.Timestamp.now() - pd.Timedelta(days=30)).isoformat()}
+    registered(monkeypatch, model, stale)
+    assert model_training.incremental_update(df) is None
+
+    # R2 logged at registration far above what the model gets on new rows
+    registered(monkeypatch, model, tags, r2=2.0)
+    assert model_training.incremental_update(df) is None
+
+def stored_readings(n_rows):
+    start = pd.Timestamp("2025-01-01")
+    docs = []
+    for h in range(n_rows):
+        doc = {"time": (start + pd.Timedelta(hours=h)).to_pydatetime(), "co": 400.0 + h, "no2": 20.0,
+               "o3": 60.0, "pm10": 80.0, "pm2_5": 45.5, "so2": 10.0, "aqi": 100 + h % 7, "city_note": "x"}
+        if h % 5 == 0:
+            del doc["pm10"]
+        if h % 11 == 0:
+            doc["so2"] = None
+        docs.append(doc)
+    return docs
+
+@pytest.mark.parametrize("downcast, dtype", [(False, np.float64), (True, np.float32)])
+def test_data_extraction_streams_typed_columns(db, monkeypatch, downcast, dtype):
+    import bson
+    import instrumentation
+
+    collection = db[model_training.data_access.READINGS_COLLECTION]
+    collection.insert_many(stored_readings(25))
+    monkeypatch.setattr(model_training.data_access, "get_database", lambda uri=None: db)
+
+    stage = f"extract_test_{downcast}"
+    with instrumentation.span(stage):
+        # Batches smaller than the collection exercise the per-batch flush
+        df = model_training.data_extraction("mongodb://unused", batch_size=7, downcast=downcast)
+
+    assert list(df.columns) == model_training.MODEL_COLUMNS
+    assert df["time"].dtype == "datetime64[ns]"
+    assert all(df[name].dtype == dtype for name in model_training.VALUE_COLUMNS)
+    assert len(df) == 25
+    assert df["co"].tolist() == [400.0 + h for h in range(25)]
+    assert df["aqi"].tolist() == [float(100 + h % 7) for h in range(25)]
+    # Missing and null fields become NaN
+    assert df["pm10"].isna().tolist() == [h % 5 == 0 for h in range(25)]
+    assert df["so2"].isna().tolist() == [h % 11 == 0 for h in range(25)]
+
+    expected_bytes = sum(
+        len(bson.encode(doc)) for doc in collection.find({}, model_training.data_access.READING_PROJECTION)
+    )
+    metrics = instrumentation.stage_metrics()
+    assert metrics[f"rows_{stage}"] == 25
+    assert metrics[f"bytes_{stage}"] == expected_bytes
+
+@pytest.fixture
+def small_search(monkeypatch):
+    # Same search code paths on a few combos and small forests
+    monkeypatch.setattr(model_training, "XGBOOST_SEARCH_SPACE", {
+        "estimator__learning_rate": [0.1, 0.3], "estimator__max_depth": [2, 3]
+    })
+    monkeypatch.setattr(model_training, "XGBOOST_SEARCH_ESTIMATORS", 20)
+    monkeypatch.setattr(model_training, "RANDOM_FOREST_SEARCH_SPACE", {
+        "estimator__max_depth": [4, None], "estimator__min_samples_leaf": [1, 5]
+    })
+    monkeypatch.setattr(model_training, "RANDOM_FOREST_MAX_ESTIMATORS", 27)
+    df = make_series(800)
+    return df[model_training.FEATURES], df[model_training.TARGETS]
+
+@pytest.mark.parametrize("search", ["search_xgboost", "search_random_forest", "search_svr"])
+def test_searches_return_fitted_multi_output_models(small_search, search):
+    X, y = small_search
+    model, space = getattr(model_training, search)(X, y)
+
+    assert isinstance(model, MultiOutputRegressor)
+    assert len(model.estimators_) == len(model_training.TARGETS)
+    assert model.predict(X[:5]).shape == (5, len(model_training.TARGETS))
+    assert space
+
+def test_early_stopping_picks_fewer_than_the_maximum_trees(small_search):
+    X, y = small_search
+    n_estimators = model_training.xgboost_early_stopping_estimators({"learning_rate": 0.3, "max_depth": 3}, X, y)
+    assert 1 <= n_estimators < model_training.XGBOOST_MAX_ESTIMATORS
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+from sklearn.multioutput import MultiOutputRegressor
+
+import prediction_intervals
+import tree_runtime
+
+def make_data(n_rows, seed):
+    # Noise grows with |x0|, so a good interval is wider for some rows
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 4))
+    signal = np.column_stack([2 * X[:, 0] + X[:, 1], X[:, 1] - X[:, 2], X[:, 3] * 3])
+    noise = rng.normal(size=signal.shape) * (0.2 + np.abs(X[:, [0]]))
+    return X, signal + noise
+
+def coverage(lower, upper, y):
+    return ((y >= lower) & (y <= upper)).mean(axis=0)
+
+@pytest.fixture(scope="module")
+def splits():
+    return make_data(2000, 0), make_data(1000, 1), make_data(4000, 2)
+
+def test_member_stats_are_median_and_spread_of_the_trees():
+    X, y = make_data(300, 0)
+    model = MultiOutputRegressor(RandomForestRegressor(n_estimators=9, max_depth=5, random_state=0)).fit(X, y)
+
+    median, spread = prediction_intervals.member_stats(tree_runtime.export_model(model), X[:50])
+    for i, forest in enumerate(model.estimators_):
+        trees = np.stack([tree.predict(X[:50]) for tree in forest.estimators_], axis=1)
+        np.testing.assert_allclose(median[:, i], np.median(trees, axis=1))
+        np.testing.assert_allclose(spread[:, i], trees.std(axis=1))
+
+def test_normalized_forest_intervals_reach_the_target_coverage(splits):
+    (X_train, y_train), (X_cal, y_cal), (X_test, y_test) = splits
+    model = MultiOutputRegressor(
+        RandomForestRegressor(n_estimators=40, min_samples_leaf=5, random_state=0)
+    ).fit(X_train, y_train)
+
+    calibration = prediction_intervals.calibrate(model, X_cal, y_cal)
+    assert calibration["normalized"] is True
+    assert len(calibration["quantiles"]) == 3
+
+    lower, median, upper = prediction_intervals.predict_intervals(
+        calibration, X_test, runtime=tree_runtime.export_model(model)
+    )
+    assert np.all(lower <= median) and np.all(median <= upper)
+    # Width follows the trees' disagreement instead of being constant
+    assert np.ptp(upper - lower, axis=0).min() > 0
+    np.testing.assert_array_less(0.86, coverage(lower, upper, y_test))
+    np.testing.assert_array_less(coverage(lower, upper, y_test), 0.95)
+
+def test_residual_intervals_reach_the_target_coverage(splits):
+    (X_train, y_train), (X_cal, y_cal), (X_test, y_test) = splits
+    model = MultiOutputRegressor(Ridge()).fit(X_train, y_train)
+
+    calibration = prediction_intervals.calibrate(model, X_cal, y_cal)
+    assert calibration["normalized"] is False
+
+    lower, center, upper = prediction_intervals.predict_intervals(calibration, X_test, model=model)
+    np.testing.assert_allclose(center, model.predict(X_test))
+    # Constant width per horizon
+    np.testing.assert_allclose(upper - lower, np.broadcast_to(2 * np.array(calibration["quantiles"]), lower.shape))
+    np.testing.assert_array_less(0.86, coverage(lower, upper, y_test))
+    np.testing.assert_array_less(coverage(lower, upper, y_test), 0.95)
+
+def test_residual_intervals_from_the_runtime_alone(splits):
+    xgb = pytest.importorskip("xgboost")
+    (X_train, y_train), (X_cal, y_cal), (X_test, y_test) = splits
+    model = MultiOutputRegressor(xgb.XGBRegressor(n_estimators=40, max_depth=3)).fit(X_train, y_train)
+
+    calibration = prediction_intervals.calibrate(model, X_cal, y_cal)
+    assert calibration["normalized"] is False
+    from_runtime = prediction_intervals.predict_intervals(calibration, X_test, runtime=tree_runtime.export_model(model))
+    from_model = prediction_intervals.predict_intervals(calibration, X_test, model=model)
+    for a, b in zip(from_runtime, from_model):
+        np.testing.assert_allclose(a, b, rtol=1e-5, atol=1e-4)
+    np.testing.assert_array_less(0.86, coverage(from_runtime[0], from_runtime[2], y_test))
+
+def test_small_calibration_sets_use_the_corrected_level():
+    X, y = make_data(9, 0)
+    model = MultiOutputRegressor(Ridge()).fit(X, y)
+    # (9 + 1) * 0.9 = 9: the largest of the nine scores
+    calibration = prediction_intervals.calibrate(model, X, y)
+    scores = np.abs(y - model.predict(X))
+    np.testing.assert_allclose(calibration["quantiles"], scores.max(axis=0))
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from feature_engine import ROLLING_FEATURES, build_rolling_features
+import streaming_features
+
+def make_readings(n_rows=200, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "time": pd.date_range("2025-01-01", periods=n_rows, freq="h"),
+        **{name: rng.uniform(1, 200, n_rows) for name in ["co", "no2", "o3", "pm10", "pm2_5", "so2", "aqi"]}
+    })
+    df.loc[rng.choice(n_rows, 20, replace=False), "pm10"] = np.nan
+    return df
+
+def test_streaming_state_matches_batch_rolling_features():
+    df = make_readings()
+    state = streaming_features.new_state()
+    rows = [streaming_features.update_state(state, reading) for reading in df.to_dict("records")]
+
+    batch = build_rolling_features(df)
+    streamed = pd.DataFrame(rows)
+    # Running sums accumulate rounding error; everything else is exact
+    for name in ROLLING_FEATURES:
+        np.testing.assert_allclose(
+            streamed[name].astype(float).to_numpy(), batch[name].to_numpy(),
+            rtol=1e-9, equal_nan=True, err_msg=name
+        )
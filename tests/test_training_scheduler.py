@@ -0,0 +1,83 @@
+import re
+
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+
+import training_scheduler
+
+BLOCK_ROWS = 50
+GAP = 12
+
+def make_data(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 4))
+    y = X @ rng.normal(size=(4, 3)) + rng.normal(scale=0.1, size=(n_rows, 3))
+    return X, y
+
+def cache_counts(capsys):
+    hits, misses = re.search(r"CV cache: (\d+) hits, (\d+) misses", capsys.readouterr().out).groups()
+    return int(hits), int(misses)
+
+def train(X, y):
+    families = {"ridge": (Ridge(), {"alpha": [0.1, 1.0]})}
+    return training_scheduler.train_families(families, X, y, max_workers=2, block_rows=BLOCK_ROWS, gap=GAP)
+
+def test_anchored_folds_are_stable_when_rows_are_appended():
+    before = training_scheduler.anchored_folds(300, 3, BLOCK_ROWS, GAP)
+    after = training_scheduler.anchored_folds(324, 3, BLOCK_ROWS, GAP)
+    for (train_before, test_before), (train_after, test_after) in zip(before, after):
+        assert np.array_equal(train_before, train_after)
+        assert np.array_equal(test_before, test_after)
+
+    # A new complete block adds one fold and keeps the other two
+    grown = training_scheduler.anchored_folds(350, 3, BLOCK_ROWS, GAP)
+    assert np.array_equal(grown[0][1], before[1][1])
+    assert np.array_equal(grown[1][1], before[2][1])
+    assert grown[2][1][0] == 300
+
+def test_anchored_folds_short_series():
+    folds = training_scheduler.anchored_folds(40, 3, BLOCK_ROWS, gap=4)
+    assert [len(test) for _, test in folds] == [10, 10, 10]
+    assert folds[0][0].tolist() == list(range(6))
+
+    with pytest.raises(ValueError):
+        training_scheduler.anchored_folds(40, 3, BLOCK_ROWS, gap=10)
+
+def test_folds_leave_a_horizon_gap_before_validation():
+    gap = training_scheduler.FOLD_GAP
+    assert gap == 72
+    for train_idx, test_idx in training_scheduler.anchored_folds(24 * 30 * 6):
+        # No training row's t+72h target falls inside the validation block
+        assert train_idx[-1] + gap < test_idx[0]
+        assert test_idx[0] - train_idx[-1] == gap + 1
+
+def test_fold_scores_hit_the_cache_after_appending_readings(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    X, y = make_data(324)
+
+    train(X[:300], y[:300])
+    assert cache_counts(capsys) == (0, 7)
+
+    # A day of new readings: every fold is unchanged, only the refit reruns
+    train(X, y)
+    assert cache_counts(capsys) == (6, 1)
+
+def test_new_block_only_refits_the_new_fold(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    X, y = make_data(350)
+
+    train(X[:300], y[:300])
+    cache_counts(capsys)
+
+    train(X, y)
+    assert cache_counts(capsys) == (4, 3)
+
+def test_refit_runs_single_threaded(tmp_path, monkeypatch):
+    from sklearn.ensemble import RandomForestRegressor
+
+    monkeypatch.chdir(tmp_path)
+    X, y = make_data(200)
+    families = {"forest": (RandomForestRegressor(n_estimators=5, n_jobs=-1, random_state=0), {"max_depth": [3]})}
+    trained = training_scheduler.train_families(families, X, y, max_workers=2, block_rows=BLOCK_ROWS, gap=GAP)
+    assert trained["forest"][0].n_jobs == 1
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.multioutput import MultiOutputRegressor
+
+import tree_runtime
+
+def make_data(n_rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 6))
+    y = np.column_stack([X[:, 0] * 3 + X[:, 1] ** 2, X[:, 2] - X[:, 3], np.sin(X[:, 4]) * 10])
+    return X, y + rng.normal(scale=0.1, size=y.shape)
+
+def test_random_forest_parity(tmp_path):
+    X, y = make_data()
+    model = MultiOutputRegressor(RandomForestRegressor(n_estimators=15, max_depth=8, random_state=0)).fit(X, y)
+
+    runtime = tree_runtime.export_model(model)
+    path = tmp_path / "runtime.npz"
+    tree_runtime.save_runtime(runtime, path)
+    runtime = tree_runtime.load_runtime(path)
+
+    X_new, _ = make_data(100, seed=1)
+    np.testing.assert_allclose(tree_runtime.predict(runtime, X_new), model.predict(X_new), rtol=1e-9, atol=1e-9)
+
+def test_xgboost_parity_with_missing_values():
+    xgb = pytest.importorskip("xgboost")
+    X, y = make_data()
+    X[::7, 2] = np.nan
+    model = MultiOutputRegressor(xgb.XGBRegressor(n_estimators=30, max_depth=4, random_state=0)).fit(X, y)
+
+    runtime = tree_runtime.export_model(model)
+    X_new, _ = make_data(100, seed=1)
+    X_new[::5, 2] = np.nan
+    # XGBoost sums leaves in float32
+    np.testing.assert_allclose(tree_runtime.predict(runtime, X_new), model.predict(X_new), rtol=1e-5, atol=1e-4)
+
+def test_other_families_are_rejected():
+    from sklearn.svm import SVR
+
+    X, y = make_data(50)
+    with pytest.raises(TypeError):
+        tree_runtime.export_model(MultiOutputRegressor(SVR()).fit(X, y))
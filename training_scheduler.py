@@ -0,0 +1,169 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.model_selection import ParameterGrid
+import cv_cache
+from feature_engine import HORIZON_HOURS
+
+# One global task queue for every (family, param combo, fold) fit, run on a
+# single process pool. The training matrices are written once to .npy files
+# and memory-mapped read-only by each worker, so they are shared through the
+# OS page cache instead of being pickled into every task.
+
+CV_FOLDS = 3
+# Rows per validation block (30 days of hourly rows). Folds are fixed-size
+# blocks anchored at the first row, so appending readings never moves the
+# boundaries of folds over older data and their cached scores keep hitting.
+FOLD_BLOCK_ROWS = int(os.getenv("AQI_CV_BLOCK_ROWS", 24 * 30))
+# Training rows dropped before each validation block: their targets look
+# up to max(HORIZON_HOURS) ahead, into the block (as TIME_SERIES_GAP in
+# model_training's halving mode)
+FOLD_GAP = max(HORIZON_HOURS)
+
+_shared = {}
+
+def _init_worker(data_dir):
+    _shared["X"] = np.load(os.path.join(data_dir, "X.npy"), mmap_mode="r")
+    _shared["y"] = np.load(os.path.join(data_dir, "y.npy"), mmap_mode="r")
+
+def single_threaded(estimator):
+    # Parallelism comes from the pool; keep each fit on one core
+    params = estimator.get_params()
+    return estimator.set_params(**{k: 1 for k in params if k.endswith("n_jobs")})
+
+def _fit_fold(estimator, params, train_idx, test_idx):
+    X, y = _shared["X"], _shared["y"]
+    model = single_threaded(clone(estimator).set_params(**params))
+    model.fit(X[train_idx], y[train_idx])
+    return model.score(X[test_idx], y[test_idx])
+
+def _fit_full(estimator, params, feature_names):
+    X = _shared["X"]
+    if feature_names is not None:
+        # Keep the column names, as a GridSearchCV refit on a DataFrame would
+        X = pd.DataFrame(X, columns=feature_names)
+    # The refits run in the same pool as the folds; same one-core rule
+    model = single_threaded(clone(estimator).set_params(**params))
+    model.fit(X, _shared["y"])
+    return model
+
+def anchored_folds(n_rows, cv=CV_FOLDS, block_rows=FOLD_BLOCK_ROWS, gap=FOLD_GAP):
+    """
+    Forward-chaining folds over fixed blocks from row 0: fold k trains on
+    rows [0, k * block_rows - gap) and validates on block k. Only complete
+    blocks are used and the newest `cv` folds are kept, so a fold changes
+    only when a new block completes. Series shorter than cv + 1 blocks are
+    split into cv + 1 equal blocks instead.
+    """
+    if n_rows < (cv + 1) * block_rows:
+        block_rows = n_rows // (cv + 1)
+    if block_rows < 1:
+        raise ValueError(f"Need at least {cv + 1} rows for {cv} folds, got {n_rows}")
+
+    blocks = n_rows // block_rows
+    if (blocks - cv) * block_rows <= gap:
+        raise ValueError(f"{n_rows} rows leave no training rows before the first fold with a {gap}-row gap")
+    return [
+        (np.arange(0, k * block_rows - gap), np.arange(k * block_rows, (k + 1) * block_rows))
+        for k in range(blocks - cv, blocks)
+    ]
+
+def _result(entry):
+    # A fold score or refit model is either cached already or still running
+    value, future, key, put = entry
+    if future is None:
+        return value
+    value = future.result()
+    put(key, value)
+    return value
+
+def train_families(families, X_train, y_train, cv=CV_FOLDS, max_workers=None, use_cache=True,
+                   block_rows=FOLD_BLOCK_ROWS, gap=FOLD_GAP):
+    """
+    Grid-search several model families at once.
+
+    `families` maps a name to (estimator, param_grid). Returns a dict of
+    name -> (refitted best estimator, param_grid), like the train_*
+    functions in model_training. Combos are ranked by mean estimator.score
+    over anchored_folds. With `use_cache`, fold scores and refits already
+    in cv_cache are reused instead of refitted.
+    """
+    feature_names = list(X_train.columns) if hasattr(X_train, "columns") else None
+    X = np.ascontiguousarray(X_train, dtype=np.float64)
+    y = np.ascontiguousarray(y_train, dtype=np.float64)
+    folds = anchored_folds(len(X), cv, block_rows, gap)
+
+    stats = {"hits": 0, "misses": 0}
+
+    def lookup(get, put, key, submit):
+        cached = get(key) if use_cache else None
+        if cached is not None:
+            stats["hits"] += 1
+            return cached, None, key, put
+        stats["misses"] += 1
+        return None, submit(), key, put if use_cache else (lambda key, value: None)
+
+    fold_fingerprints = [
+        cv_cache.fingerprint(X[train_idx], y[train_idx], X[test_idx], y[test_idx])
+        for train_idx, test_idx in folds
+    ]
+
+    data_dir = tempfile.mkdtemp(prefix="aqi_training_")
+    try:
+        np.save(os.path.join(data_dir, "X.npy"), X)
+        np.save(os.path.join(data_dir, "y.npy"), y)
+
+        with ProcessPoolExecutor(
+            max_workers=max_workers or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=(data_dir,)
+        ) as pool:
+            tasks = {}
+            for name, (estimator, param_grid) in families.items():
+                for i, params in enumerate(ParameterGrid(param_grid)):
+                    candidate = clone(estimator).set_params(**params)
+                    for (train_idx, test_idx), data_fingerprint in zip(folds, fold_fingerprints):
+                        key = cv_cache.make_key("fold", data_fingerprint, feature_names, candidate)
+                        entry = lookup(
+                            cv_cache.get_score, cv_cache.put_score, key,
+                            lambda: pool.submit(_fit_fold, estimator, params, train_idx, test_idx)
+                        )
+                        tasks.setdefault((name, i), (params, []))[1].append(entry)
+
+            # Best combo per family by mean fold score; first wins on ties
+            best = {}
+            for (name, i), (params, entries) in tasks.items():
+                score = np.mean([_result(entry) for entry in entries])
+                if name not in best or score > best[name][1]:
+                    best[name] = (params, score)
+
+            full_fingerprint = cv_cache.fingerprint(X, y)
+            refits = {}
+            for name, (params, _) in best.items():
+                estimator = families[name][0]
+                key = cv_cache.make_key(
+                    "refit", full_fingerprint, feature_names, clone(estimator).set_params(**params)
+                )
+                refits[name] = lookup(
+                    cv_cache.get_model, cv_cache.put_model, key,
+                    lambda: pool.submit(_fit_full, estimator, params, feature_names)
+                )
+            trained = {
+                name: (_result(entry), families[name][1])
+                for name, entry in refits.items()
+            }
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    for name, (params, score) in best.items():
+        print(f"{name}: best CV score {score:.4f} with {params}")
+
+    if use_cache:
+        evicted = cv_cache.evict()
+        print(f"CV cache: {stats['hits']} hits, {stats['misses']} misses, {evicted} evicted")
+
+    return trained
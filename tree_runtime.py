@@ -0,0 +1,166 @@
+import json
+import numpy as np
+
+# Numpy-only runtime for the tree ensembles in AQI_Predictor_Model. A fitted
+# MultiOutputRegressor of RandomForest or XGBoost estimators is flattened
+# into contiguous node arrays shared by every tree of every horizon:
+#
+#   feature, threshold, left, right, default_left, value   (one per node)
+#   roots, weights, tree_output                            (one per tree)
+#   bias                                                   (one per output)
+#
+# Every split is "go left if x <= threshold"; leaves have left == -1.
+# A prediction is bias[o] + sum(weights[t] * leaf value of tree t) over the
+# trees t of output o, computed for all rows and trees in one traversal.
+
+# Location of the export among the registered run's artifacts
+RUNTIME_ARTIFACT_PATH = "tree_runtime"
+RUNTIME_FILE = "runtime.npz"
+
+def _empty():
+    return {name: [] for name in ["feature", "threshold", "left", "right", "default_left", "value"]}
+
+def _node_count(nodes):
+    return sum(len(part) for part in nodes["feature"])
+
+def _append_sklearn_tree(nodes, tree):
+    offset = _node_count(nodes)
+    is_leaf = tree.children_left == -1
+    nodes["feature"].append(np.where(is_leaf, 0, tree.feature))
+    nodes["threshold"].append(tree.threshold)
+    nodes["left"].append(np.where(is_leaf, -1, tree.children_left + offset))
+    nodes["right"].append(np.where(is_leaf, -1, tree.children_right + offset))
+    missing_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=np.uint8))
+    nodes["default_left"].append(missing_left.astype(bool))
+    nodes["value"].append(tree.value[:, 0, 0])
+    return offset
+
+def _append_xgboost_tree(nodes, tree, feature_index):
+    """
+    `tree` is one tree's rows of Booster.trees_to_dataframe(). XGBoost
+    splits on x < split in float32; that equals x <= the next float32 below
+    the split, which keeps the runtime's single comparison rule.
+    """
+    offset = _node_count(nodes)
+    node_ids = {node_id: offset + i for i, node_id in enumerate(tree["ID"])}
+    is_leaf = (tree["Feature"] == "Leaf").to_numpy()
+
+    split = tree["Split"].to_numpy(dtype=np.float64)
+    threshold = np.nextafter(split.astype(np.float32), np.float32(-np.inf)).astype(np.float64)
+
+    nodes["feature"].append(np.array(
+        [0 if leaf else feature_index[name] for leaf, name in zip(is_leaf, tree["Feature"])]
+    ))
+    nodes["threshold"].append(np.where(is_leaf, 0.0, threshold))
+    nodes["left"].append(np.array([-1 if leaf else node_ids[n] for leaf, n in zip(is_leaf, tree["Yes"])]))
+    nodes["right"].append(np.array([-1 if leaf else node_ids[n] for leaf, n in zip(is_leaf, tree["No"])]))
+    nodes["default_left"].append(np.array(
+        [False if leaf else m == y for leaf, m, y in zip(is_leaf, tree["Missing"], tree["Yes"])]
+    ))
+    nodes["value"].append(np.where(is_leaf, tree["Gain"].to_numpy(dtype=np.float64), 0.0))
+    return node_ids[tree["ID"].iloc[0]]
+
+def _xgboost_base_score(booster):
+    config = json.loads(booster.save_config())
+    base_score = config["learner"]["learner_model_param"]["base_score"]
+    # Newer XGBoost versions store a vector such as "[1.23E2]"
+    return float(str(base_score).strip("[]").split(",")[0])
+
+def export_model(model):
+    """
+    Flatten a fitted MultiOutputRegressor of RandomForestRegressor or
+    XGBRegressor estimators. Raises TypeError for other model families.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+
+    nodes = _empty()
+    roots, weights, tree_output, bias = [], [], [], []
+    n_features = model.estimators_[0].n_features_in_
+
+    for output, estimator in enumerate(model.estimators_):
+        if isinstance(estimator, RandomForestRegressor):
+            trees = [t.tree_ for t in estimator.estimators_]
+            for tree in trees:
+                roots.append(_append_sklearn_tree(nodes, tree))
+                weights.append(1.0 / len(trees))
+                tree_output.append(output)
+            bias.append(0.0)
+        elif type(estimator).__name__ == "XGBRegressor":
+            booster = estimator.get_booster()
+            names = booster.feature_names or [f"f{i}" for i in range(n_features)]
+            feature_index = {name: i for i, name in enumerate(names)}
+            frame = booster.trees_to_dataframe()
+            for _, tree in frame.groupby("Tree", sort=True):
+                roots.append(_append_xgboost_tree(nodes, tree, feature_index))
+                weights.append(1.0)
+                tree_output.append(output)
+            bias.append(_xgboost_base_score(booster))
+        else:
+            raise TypeError(f"Cannot export {type(estimator).__name__}")
+
+    runtime = {
+        "feature": np.concatenate(nodes["feature"]).astype(np.int32),
+        "threshold": np.concatenate(nodes["threshold"]).astype(np.float64),
+        "left": np.concatenate(nodes["left"]).astype(np.int32),
+        "right": np.concatenate(nodes["right"]).astype(np.int32),
+        "default_left": np.concatenate(nodes["default_left"]).astype(bool),
+        "value": np.concatenate(nodes["value"]).astype(np.float64),
+        "roots": np.array(roots, dtype=np.int32),
+        "weights": np.array(weights, dtype=np.float64),
+        "tree_output": np.array(tree_output, dtype=np.int32),
+        "bias": np.array(bias, dtype=np.float64),
+        "n_features": np.array(n_features, dtype=np.int32)
+    }
+    runtime["max_depth"] = np.array(_max_depth(runtime), dtype=np.int32)
+    return runtime
+
+def _max_depth(runtime):
+    depth = 0
+    frontier = runtime["roots"]
+    left, right = runtime["left"], runtime["right"]
+    while True:
+        frontier = frontier[left[frontier] != -1]
+        if len(frontier) == 0:
+            return depth
+        frontier = np.concatenate([left[frontier], right[frontier]])
+        depth += 1
+
+def save_runtime(runtime, path):
+    np.savez(path, **runtime)
+
+def load_runtime(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+def predict_trees(runtime, X):
+    """
+    Leaf value of every tree for every row of X, as an (n_rows, n_trees)
+    array, from one batched traversal of all trees
+    """
+    # Trees compare float32 features, as sklearn and XGBoost do
+    X = np.asarray(X, dtype=np.float32).astype(np.float64)
+    feature, threshold = runtime["feature"], runtime["threshold"]
+    left, right = runtime["left"], runtime["right"]
+    default_left = runtime["default_left"]
+
+    rows = np.arange(len(X))[:, None]
+    node = np.broadcast_to(runtime["roots"], (len(X), len(runtime["roots"]))).copy()
+
+    for _ in range(int(runtime["max_depth"])):
+        x = X[rows, feature[node]]
+        go_left = np.where(np.isnan(x), default_left[node], x <= threshold[node])
+        child = np.where(go_left, left[node], right[node])
+        node = np.where(left[node] == -1, node, child)
+
+    return runtime["value"][node]
+
+def predict(runtime, X):
+    """
+    Predict every horizon for every row of X in one batched traversal of
+    all trees. Returns an (n_rows, n_outputs) array.
+    """
+    # Sum weighted leaf values into their outputs with one matrix product
+    n_trees, n_outputs = len(runtime["roots"]), len(runtime["bias"])
+    combine = np.zeros((n_trees, n_outputs))
+    combine[np.arange(n_trees), runtime["tree_output"]] = runtime["weights"]
+    return predict_trees(runtime, X) @ combine + runtime["bias"]